@@ -0,0 +1,99 @@
+"""Insert throughput, in rows/second, for the ways of writing many posts.
+
+``per_row`` runs one INSERT per row in its own transaction, as create_post
+does per request. ``executemany`` and ``multi_row`` insert a whole batch in
+one transaction; ``multi_row`` is the single INSERT ... VALUES ... RETURNING
+statement the bulk endpoints use to get the new ids back. Run with:
+
+    python -m benchmarks.bulk_writes --rows 20000 --batch-size 500
+"""
+
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.sqlite_tuning import tuned_profile
+from social_media.sqlite_tuning import sqlite_pragmas, tuned_connection_factory
+
+insert_sql = "INSERT INTO posts (body, user_id) VALUES (?, ?)"
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    connection = sqlite3.connect(
+        path,
+        isolation_level=None,
+        factory=tuned_connection_factory(sqlite_pragmas(tuned_profile)),
+    )
+    connection.execute(
+        "CREATE TABLE posts (id INTEGER PRIMARY KEY, body VARCHAR, "
+        "user_id INTEGER, like_count INTEGER NOT NULL DEFAULT 0)"
+    )
+    return connection
+
+
+def per_row(connection: sqlite3.Connection, batch: list[tuple]) -> None:
+    for row in batch:
+        connection.execute("BEGIN")
+        connection.execute(insert_sql, row)
+        connection.execute("COMMIT")
+
+
+def executemany(connection: sqlite3.Connection, batch: list[tuple]) -> None:
+    connection.execute("BEGIN")
+    connection.executemany(insert_sql, batch)
+    connection.execute("COMMIT")
+
+
+def multi_row(connection: sqlite3.Connection, batch: list[tuple]) -> None:
+    values = ", ".join(["(?, ?)"] * len(batch))
+    parameters = [value for row in batch for value in row]
+    connection.execute("BEGIN")
+    connection.execute(
+        f"INSERT INTO posts (body, user_id) VALUES {values} RETURNING id", parameters
+    ).fetchall()
+    connection.execute("COMMIT")
+
+
+strategies = {
+    "per_row": per_row,
+    "executemany": executemany,
+    "multi_row": multi_row,
+}
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bulk_writes")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args(argv)
+
+    rows = [(f"post {i}", i % 100) for i in range(args.rows)]
+    batches = [
+        rows[i : i + args.batch_size] for i in range(0, len(rows), args.batch_size)
+    ]
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, strategy in strategies.items():
+            connection = connect(Path(directory) / f"{name}.db")
+            start = time.perf_counter()
+            for batch in batches:
+                strategy(connection, batch)
+            elapsed = time.perf_counter() - start
+            connection.close()
+            report[name] = {"rows_per_second": args.rows / elapsed}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+    print(f"{'strategy':<14}{'rows/s':>12}")
+    for name, result in report.items():
+        print(f"{name:<14}{result['rows_per_second']:>12.0f}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
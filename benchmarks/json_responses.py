@@ -0,0 +1,99 @@
+"""Time to turn a page of post records into a JSON response body.
+
+``response_model`` is what FastAPI does for a route returning records:
+validate every record into ``UserPostWithLikes`` (``from_attributes``) and
+dump the result with pydantic. ``fast_json`` is the path used when
+``FAST_JSON_ENABLED`` is set: records become plain dicts, one row is validated
+against the schema, and orjson renders the page. Run with:
+
+    python -m benchmarks.json_responses --rows 10000
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import databases
+from pydantic import TypeAdapter
+
+from social_media.models.post import UserPostPage, UserPostWithLikes
+from social_media.responses import ORJSONResponse, RecordSerializer
+
+
+async def fetch_records(path: Path, rows: int) -> list:
+    database = databases.Database(f"sqlite:///{path}")
+    await database.connect()
+    await database.execute(
+        "CREATE TABLE posts (id INTEGER PRIMARY KEY, body VARCHAR, "
+        "user_id INTEGER, like_count INTEGER NOT NULL DEFAULT 0)"
+    )
+    await database.execute_many(
+        "INSERT INTO posts (body, user_id, like_count) VALUES (:body, :user, :likes)",
+        [
+            {"body": f"post body {i} " * 4, "user": i % 100, "likes": i % 7}
+            for i in range(rows)
+        ],
+    )
+    records = await database.fetch_all(
+        "SELECT id, body, user_id, like_count AS likes FROM posts ORDER BY id DESC"
+    )
+    await database.disconnect()
+    return records
+
+
+def response_model(records: list) -> bytes:
+    adapter = TypeAdapter(UserPostPage)
+    page = adapter.validate_python({"posts": records, "next_cursor": None})
+    return adapter.dump_json(page)
+
+
+def fast_json(records: list) -> bytes:
+    posts = RecordSerializer(UserPostWithLikes)(records)
+    return ORJSONResponse({"posts": posts, "next_cursor": None}).body
+
+
+strategies = {
+    "response_model": response_model,
+    "fast_json": fast_json,
+}
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.json_responses")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        records = asyncio.run(fetch_records(Path(directory) / "posts.db", args.rows))
+
+    bodies = {name: strategy(records) for name, strategy in strategies.items()}
+    # Same document from every strategy, only the key order may differ
+    documents = {
+        json.dumps(json.loads(body), sort_keys=True) for body in bodies.values()
+    }
+    assert len(documents) == 1
+
+    report = {}
+    for name, strategy in strategies.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            strategy(records)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        report[name] = {"ms_per_response": elapsed * 1000, "bytes": len(bodies[name])}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+    print(f"{'strategy':<16}{'ms/response':>14}{'bytes':>12}")
+    for name, result in report.items():
+        print(f"{name:<16}{result['ms_per_response']:>14.2f}{result['bytes']:>12}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""Load test of the API: throughput and latency percentiles per endpoint.
+
+Seeds a throwaway SQLite database with users, posts, follows, likes and
+comments, the likes and comments spread over posts by a power law so a few
+posts get most of them. Then starts the app from ``social_media.main`` with
+its lifespan and sends requests to it in-process through httpx's
+ASGITransport, ``--concurrency`` at a time, for one scenario after another:
+every sorting of the post list (each client following ``next_cursor`` for up
+to ``--pages`` pages), post detail, login, like, comment and home timeline.
+
+The app runs with the production config (``ENV_STATE=prod``) against the
+seeded database; other ``PROD_*`` variables are kept, so a setting can be
+compared by running with and without it. Client and app share one event loop,
+so latencies include the client's share of the work. Run with:
+
+    python -m benchmarks.load_test --users 1000 --posts 10000 --likes 100000
+    python -m benchmarks.load_test --json --save baseline.json
+    python -m benchmarks.load_test --baseline baseline.json --tolerance 0.25
+
+With ``--baseline``, a scenario whose throughput dropped, or whose p95 or p99
+latency grew, by more than ``--tolerance``, or whose share of failed requests
+grew at all, is reported as a regression and the command exits with status 1.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+PASSWORD = "load-test-password"
+SORTINGS = ("new", "old", "most_likes", "least_likes", "trending")
+
+
+@dataclass
+class Dataset:
+    users: int
+    posts: int
+    # Cumulative popularity weights of the posts, for rng.choices
+    post_weights: list[float]
+    # (post_id, user_id) of every like, seeded or sent
+    liked: set[tuple[int, int]]
+    tokens: dict[int, str] = field(default_factory=dict)
+
+
+@dataclass
+class Session:
+    """The state of one simulated client."""
+
+    client: httpx.AsyncClient
+    rng: random.Random
+    dataset: Dataset
+    cursor: str | None = None
+    page: int = 0
+
+
+def cumulative_power_law(count: int, exponent: float, rng: random.Random) -> list:
+    """Cumulative weights giving the item of rank r a share of 1 / r ** exponent.
+
+    Ranks are shuffled over the items, so the popular ones are not all old.
+    """
+    weights = [1 / rank**exponent for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+def timestamp(seconds: float) -> str:
+    """Seconds since 1970 in SQLite's CURRENT_TIMESTAMP format."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+
+
+def seed(
+    path: Path, args: argparse.Namespace, password_hash: str, fanout_max_followers: int
+) -> Dataset:
+    """Fill the migrated database at ``path`` and return what the clients draw from."""
+    rng = random.Random(args.seed)
+    now = time.time()
+    start = now - args.days * 86400
+    user_ids = range(1, args.users + 1)
+    post_ids = range(1, args.posts + 1)
+    post_weights = cumulative_power_law(args.posts, args.exponent, rng)
+    user_weights = cumulative_power_law(args.users, args.exponent, rng)
+
+    post_times = sorted(rng.uniform(start, now) for _ in post_ids)
+    posts = [
+        (post_id, f"post {post_id} " * 8, rng.randint(1, args.users), timestamp(t))
+        for post_id, t in zip(post_ids, post_times)
+    ]
+
+    # A post cannot get more likes than there are users
+    likes_per_post = Counter(
+        rng.choices(post_ids, cum_weights=post_weights, k=args.likes)
+    )
+    likes = []
+    for post_id, count in likes_per_post.items():
+        created = post_times[post_id - 1]
+        for user_id in rng.sample(user_ids, min(count, args.users)):
+            likes.append((rng.uniform(created, now), post_id, user_id))
+    likes.sort()
+
+    comments = [
+        (f"comment {i} " * 4, post_id, rng.randint(1, args.users))
+        for i, post_id in enumerate(
+            rng.choices(post_ids, cum_weights=post_weights, k=args.comments)
+        )
+    ]
+
+    follows = set()
+    for follower_id in user_ids:
+        for followee_id in rng.choices(
+            user_ids, cum_weights=user_weights, k=args.follows
+        ):
+            if followee_id != follower_id:
+                follows.add((follower_id, followee_id))
+
+    connection = sqlite3.connect(path, isolation_level=None)
+    with contextlib.closing(connection):
+        connection.execute("BEGIN")
+        connection.executemany(
+            "INSERT INTO users (id, email, password, confirmed) VALUES (?, ?, ?, 1)",
+            [(i, f"user{i}@example.com", password_hash) for i in user_ids],
+        )
+        connection.executemany(
+            "INSERT INTO posts (id, body, user_id, created_at) VALUES (?, ?, ?, ?)",
+            posts,
+        )
+        connection.executemany(
+            "INSERT INTO likes (post_id, user_id, created_at) VALUES (?, ?, ?)",
+            [(post_id, user_id, timestamp(t)) for t, post_id, user_id in likes],
+        )
+        connection.executemany(
+            "INSERT INTO comments (body, post_id, user_id) VALUES (?, ?, ?)", comments
+        )
+        connection.executemany(
+            "INSERT INTO follows (follower_id, followee_id) VALUES (?, ?)",
+            sorted(follows),
+        )
+        # What the endpoints would have kept in step had the rows come through them
+        connection.execute(
+            "UPDATE posts SET like_count = "
+            "(SELECT count(*) FROM likes WHERE likes.post_id = posts.id)"
+        )
+        connection.execute(
+            "UPDATE users SET follower_count = "
+            "(SELECT count(*) FROM follows WHERE follows.followee_id = users.id)"
+        )
+        connection.execute(
+            "UPDATE users SET fan_out_on_read = 1 WHERE follower_count > ?",
+            (fanout_max_followers,),
+        )
+        connection.execute(
+            "INSERT INTO timelines (user_id, post_id) "
+            "SELECT follows.follower_id, posts.id FROM follows "
+            "JOIN users ON users.id = follows.followee_id "
+            "JOIN posts ON posts.user_id = follows.followee_id "
+            "WHERE NOT users.fan_out_on_read"
+        )
+        connection.execute("COMMIT")
+
+    return Dataset(
+        users=args.users,
+        posts=args.posts,
+        post_weights=post_weights,
+        liked={(post_id, user_id) for _, post_id, user_id in likes},
+    )
+
+
+def popular_post(session: Session) -> int:
+    rng, dataset = session.rng, session.dataset
+    return rng.choices(range(1, dataset.posts + 1), cum_weights=dataset.post_weights)[0]
+
+
+def auth_headers(session: Session, user_id: int) -> dict:
+    from social_media.security import create_access_token
+
+    tokens = session.dataset.tokens
+    if user_id not in tokens:
+        tokens[user_id] = create_access_token(f"user{user_id}@example.com")
+    return {"Authorization": f"Bearer {tokens[user_id]}"}
+
+
+def list_posts(sorting: str, pages: int) -> Callable:
+    async def request(session: Session) -> httpx.Response:
+        params = {"sorting": sorting}
+        if session.cursor:
+            params["cursor"] = session.cursor
+        response = await session.client.get("/posts/post", params=params)
+        session.page += 1
+        session.cursor = None
+        if response.status_code == 200 and session.page < pages:
+            session.cursor = response.json()["next_cursor"]
+        if session.cursor is None:
+            session.page = 0
+        return response
+
+    return request
+
+
+async def post_detail(session: Session) -> httpx.Response:
+    return await session.client.get(f"/posts/post/{popular_post(session)}")
+
+
+async def login(session: Session) -> httpx.Response:
+    user_id = session.rng.randint(1, session.dataset.users)
+    return await session.client.post(
+        "/users/token",
+        json={"email": f"user{user_id}@example.com", "password": PASSWORD},
+    )
+
+
+async def like(session: Session) -> httpx.Response:
+    # Popular posts run out of users who have not liked them yet; give up on
+    # finding a new pair after a while and let the 409 count as an error
+    for _ in range(100):
+        post_id = popular_post(session)
+        user_id = session.rng.randint(1, session.dataset.users)
+        if (post_id, user_id) not in session.dataset.liked:
+            break
+    session.dataset.liked.add((post_id, user_id))
+    return await session.client.post(
+        "/posts/like", json={"post_id": post_id}, headers=auth_headers(session, user_id)
+    )
+
+
+async def comment(session: Session) -> httpx.Response:
+    user_id = session.rng.randint(1, session.dataset.users)
+    return await session.client.post(
+        "/posts/comment",
+        json={"body": "load test comment", "post_id": popular_post(session)},
+        headers=auth_headers(session, user_id),
+    )
+
+
+async def timeline(session: Session) -> httpx.Response:
+    user_id = session.rng.randint(1, session.dataset.users)
+    return await session.client.get(
+        "/posts/timeline", headers=auth_headers(session, user_id)
+    )
+
+
+def scenarios(pages: int) -> dict[str, Callable[[Session], Awaitable]]:
+    # Reads first, so they see the seeded data rather than what writes added
+    return {
+        **{f"list_{sorting}": list_posts(sorting, pages) for sorting in SORTINGS},
+        "post_detail": post_detail,
+        "timeline": timeline,
+        "login": login,
+        "like": like,
+        "comment": comment,
+    }
+
+
+def percentile(latencies: list[float], p: float) -> float:
+    """Nearest-rank percentile of sorted ``latencies``."""
+    if not latencies:
+        return 0.0
+    return latencies[max(0, math.ceil(p / 100 * len(latencies)) - 1)]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    scenario: Callable[[Session], Awaitable],
+    dataset: Dataset,
+    args: argparse.Namespace,
+    requests: int,
+) -> dict:
+    latencies = []
+    statuses = Counter()
+    remaining = requests
+
+    async def worker(index: int) -> None:
+        nonlocal remaining
+        session = Session(client, random.Random(f"{args.seed}-{name}-{index}"), dataset)
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await scenario(session)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": requests / elapsed,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+async def run(app, dataset: Dataset, args: argparse.Namespace) -> dict:
+    from social_media.trending import trending_ranker
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        # The lifespan set up the app's logging; keep it from timing the console
+        logging.getLogger("social_media").setLevel(args.log_level)
+        # Let the ranker score the seeded likes before the trending list is read
+        while trending_ranker.running and not trending_ranker.refreshes:
+            await asyncio.sleep(0.01)
+        # An exception in the app comes back as a 500 and counts as an error
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://load-test"
+        ) as client:
+            for name, scenario in scenarios(args.pages).items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                # bcrypt makes logins far slower than the other requests
+                requests = args.login_requests if name == "login" else args.requests
+                if args.warmup:
+                    warmup = min(args.warmup, requests)
+                    await run_scenario(client, name, scenario, dataset, args, warmup)
+                results[name] = await run_scenario(
+                    client, name, scenario, dataset, args, requests
+                )
+    return results
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Scenarios that got slower than ``baseline`` by more than ``tolerance``."""
+    regressions = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput_rps']:.1f} rps, "
+                f"was {before['throughput_rps']:.1f}"
+            )
+        error_rate = result["errors"] / result["requests"]
+        if error_rate > before["errors"] / before["requests"]:
+            regressions.append(
+                f"{name}: {result['errors']} errors in {result['requests']} "
+                f"requests, was {before['errors']} in {before['requests']}"
+            )
+        for key in ("p95_ms", "p99_ms"):
+            if result[key] > before[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {key} {result[key]:.2f}, was {before[key]:.2f}"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--likes", type=int, default=100_000)
+    parser.add_argument("--comments", type=int, default=30_000)
+    parser.add_argument("--follows", type=int, default=20, help="per user")
+    parser.add_argument(
+        "--exponent", type=float, default=1.1, help="of the power law popularity"
+    )
+    parser.add_argument(
+        "--days", type=float, default=2, help="over which posts and likes are spread"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="per scenario")
+    parser.add_argument("--login-requests", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=50, help="per scenario")
+    parser.add_argument("--pages", type=int, default=5, help="of a post list")
+    parser.add_argument(
+        "--scenarios", type=lambda value: value.split(","), help="comma separated"
+    )
+    parser.add_argument("--log-level", default="WARNING", help="of the app's logs")
+    parser.add_argument("--baseline", type=Path, help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save", type=Path, help="write the report to this file")
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "load.db"
+        # The config is read when social_media is first imported
+        os.environ["ENV_STATE"] = "prod"
+        os.environ["PROD_DATABASE_URL"] = f"sqlite:///{path}"
+        from social_media.config import config
+        from social_media.main import app
+        from social_media.security import hash_password
+
+        dataset = seed(
+            path,
+            args,
+            hash_password(PASSWORD),
+            config.TIMELINE_FANOUT_MAX_FOLLOWERS,
+        )
+        # The app's log file goes into the throwaway directory too
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            results = asyncio.run(run(app, dataset, args))
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "dataset": {
+            "users": args.users,
+            "posts": args.posts,
+            "likes": args.likes,
+            "comments": args.comments,
+            "follows_per_user": args.follows,
+            "exponent": args.exponent,
+            "seed": args.seed,
+        },
+        "load": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "login_requests": args.login_requests,
+            "warmup": args.warmup,
+            "pages": args.pages,
+        },
+        "scenarios": results,
+    }
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        report["regressions"] = compare(report, baseline, args.tolerance)
+    if args.save:
+        args.save.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+    print(
+        f"{'scenario':<18}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'errors':>8}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<18}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}"
+        )
+    for regression in report.get("regressions", []):
+        print(f"REGRESSION {regression}")
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main().get("regressions") else 0)
@@ -0,0 +1,159 @@
+"""Compare the hot queries before and after the index migration.
+
+Seeds a throwaway SQLite database at schema version 1 (no secondary indexes),
+times each query and records its plan, then migrates to the latest version and
+repeats. Run with:
+
+    python -m benchmarks.query_plans --posts 20000 --likes 200000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import sqlalchemy
+
+from social_media.migrations import backfill_like_counts, migrate
+
+baseline_schema = [
+    (
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR UNIQUE, "
+        "password VARCHAR, confirmed BOOLEAN)"
+    ),
+    "CREATE TABLE posts (id INTEGER PRIMARY KEY, body VARCHAR, user_id INTEGER)",
+    (
+        "CREATE TABLE comments (id INTEGER PRIMARY KEY, body VARCHAR, "
+        "post_id INTEGER NOT NULL, user_id INTEGER)"
+    ),
+    (
+        "CREATE TABLE likes (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, "
+        "user_id INTEGER)"
+    ),
+]
+
+# Mirrors the statements issued by social_media/routers/post.py
+hot_queries = {
+    "comments_on_post": "SELECT * FROM comments WHERE post_id = :post_id",
+    "like_exists": "SELECT id FROM likes WHERE post_id = :post_id AND user_id = :user_id",
+    "count_likes_of_post": "SELECT count(id) FROM likes WHERE post_id = :post_id",
+    "likes_of_user": "SELECT post_id FROM likes WHERE user_id = :user_id",
+    "most_likes_page": "SELECT id, body, user_id, like_count AS likes FROM posts "
+    "ORDER BY like_count DESC, id DESC LIMIT 21",
+}
+
+
+def seed(connection: sqlalchemy.Connection, args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    connection.execute(
+        sqlalchemy.text("INSERT INTO users (id, email) VALUES (:id, :email)"),
+        [{"id": i, "email": f"user{i}@example.com"} for i in range(1, args.users + 1)],
+    )
+    connection.execute(
+        sqlalchemy.text(
+            "INSERT INTO posts (id, body, user_id) VALUES (:id, :body, :user_id)"
+        ),
+        [
+            {"id": i, "body": f"post {i}", "user_id": rng.randint(1, args.users)}
+            for i in range(1, args.posts + 1)
+        ],
+    )
+    connection.execute(
+        sqlalchemy.text(
+            "INSERT INTO comments (body, post_id, user_id) VALUES (:body, :post_id, :user_id)"
+        ),
+        [
+            {
+                "body": "comment",
+                "post_id": rng.randint(1, args.posts),
+                "user_id": rng.randint(1, args.users),
+            }
+            for _ in range(args.comments)
+        ],
+    )
+    likes = {
+        (rng.randint(1, args.posts), rng.randint(1, args.users))
+        for _ in range(args.likes)
+    }
+    connection.execute(
+        sqlalchemy.text(
+            "INSERT INTO likes (post_id, user_id) VALUES (:post_id, :user_id)"
+        ),
+        [{"post_id": post_id, "user_id": user_id} for post_id, user_id in likes],
+    )
+    connection.execute(sqlalchemy.text(backfill_like_counts))
+
+
+def measure(connection: sqlalchemy.Connection, args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    results = {}
+    for name, sql in hot_queries.items():
+        statement = sqlalchemy.text(sql)
+        params = [
+            {
+                "post_id": rng.randint(1, args.posts),
+                "user_id": rng.randint(1, args.users),
+            }
+            for _ in range(args.repeat)
+        ]
+        plan = connection.execute(
+            sqlalchemy.text(f"EXPLAIN QUERY PLAN {sql}"), params[0]
+        )
+        start = time.perf_counter()
+        for param in params:
+            connection.execute(statement, param).fetchall()
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "plan": [row[-1] for row in plan],
+            "mean_ms": elapsed / args.repeat * 1000,
+        }
+    return results
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.query_plans")
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--posts", type=int, default=20_000)
+    parser.add_argument("--comments", type=int, default=100_000)
+    parser.add_argument("--likes", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = sqlalchemy.create_engine(f"sqlite:///{Path(directory) / 'bench.db'}")
+        with engine.begin() as connection:
+            for statement in baseline_schema:
+                connection.execute(sqlalchemy.text(statement))
+            migrate(connection, sqlalchemy.MetaData(), target=1)
+            seed(connection, args)
+        with engine.begin() as connection:
+            before = measure(connection, args)
+        with engine.begin() as connection:
+            migrate(connection, sqlalchemy.MetaData())
+            connection.execute(sqlalchemy.text("ANALYZE"))
+        with engine.begin() as connection:
+            after = measure(connection, args)
+        engine.dispose()
+
+    report = {
+        name: {"before": before[name], "after": after[name]} for name in hot_queries
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+    print(f"{'query':<22}{'before ms':>12}{'after ms':>12}{'speedup':>10}  plan after")
+    for name, result in report.items():
+        old, new = result["before"]["mean_ms"], result["after"]["mean_ms"]
+        print(
+            f"{name:<22}{old:>12.3f}{new:>12.3f}{old / new:>9.1f}x  "
+            + "; ".join(result["after"]["plan"])
+        )
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Concurrent read/write throughput with and without the SQLite tuning profile.
+
+Each profile gets its own seeded database; reader threads page through posts
+while writer threads insert posts, each statement in its own transaction, as
+the app does. Run with:
+
+    python -m benchmarks.sqlite_tuning --readers 4 --writers 2 --seconds 5
+"""
+
+import argparse
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from social_media.sqlite_tuning import sqlite_pragmas, tuned_connection_factory
+
+# Same values as the GlobalConfig defaults
+tuned_profile = SimpleNamespace(
+    SQLITE_JOURNAL_MODE="WAL",
+    SQLITE_SYNCHRONOUS="NORMAL",
+    SQLITE_CACHE_SIZE=-64000,
+    SQLITE_MMAP_SIZE=256 * 1024 * 1024,
+    SQLITE_BUSY_TIMEOUT_MS=5000,
+    SQLITE_TEMP_STORE="MEMORY",
+)
+
+read_sql = (
+    "SELECT id, body, user_id, like_count FROM posts "
+    "WHERE id < ? ORDER BY id DESC LIMIT 21"
+)
+write_sql = "INSERT INTO posts (body, user_id, like_count) VALUES (?, ?, 0)"
+
+
+def seed(path: Path, posts: int) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE posts (id INTEGER PRIMARY KEY, body VARCHAR, "
+        "user_id INTEGER, like_count INTEGER NOT NULL DEFAULT 0)"
+    )
+    connection.executemany(write_sql, [(f"post {i}", i % 100) for i in range(posts)])
+    connection.commit()
+    connection.close()
+
+
+def run_profile(path: Path, factory, args: argparse.Namespace) -> dict:
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def connect() -> sqlite3.Connection:
+        # isolation_level=None: autocommit, like aiosqlite behind databases
+        return sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False, factory=factory
+        )
+
+    def worker(kind: str) -> None:
+        connection = connect()
+        done = errors = 0
+        while not stop.is_set():
+            try:
+                if kind == "reads":
+                    connection.execute(read_sql, (args.posts,)).fetchall()
+                else:
+                    connection.execute(write_sql, ("new post", 1))
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        connection.close()
+        with lock:
+            counts[kind] += done
+            counts["errors"] += errors
+
+    threads = [
+        threading.Thread(target=worker, args=("reads",)) for _ in range(args.readers)
+    ] + [threading.Thread(target=worker, args=("writes",)) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        "reads_per_second": counts["reads"] / args.seconds,
+        "writes_per_second": counts["writes"] / args.seconds,
+        "errors": counts["errors"],
+    }
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.sqlite_tuning")
+    parser.add_argument("--posts", type=int, default=50_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args(argv)
+
+    profiles = {
+        "default": sqlite3.Connection,
+        "tuned": tuned_connection_factory(sqlite_pragmas(tuned_profile)),
+    }
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, factory in profiles.items():
+            path = Path(directory) / f"{name}.db"
+            seed(path, args.posts)
+            report[name] = run_profile(path, factory, args)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+    print(f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'errors':>10}")
+    for name, result in report.items():
+        print(
+            f"{name:<10}{result['reads_per_second']:>12.0f}"
+            f"{result['writes_per_second']:>12.0f}{result['errors']:>10}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    main()
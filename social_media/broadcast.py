@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import orjson
+
+from social_media.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class Event:
+    """A published event, encoded once as a server-sent event for every subscriber."""
+
+    __slots__ = ("id", "message")
+
+    def __init__(self, id: int, name: str, data: dict) -> None:
+        self.id = id
+        self.message = b"id: %d\nevent: %s\ndata: %s\n\n" % (
+            id,
+            name.encode(),
+            orjson.dumps(data),
+        )
+
+
+class Subscriber:
+    def __init__(self, queue_size: int) -> None:
+        # None tells the consumer its stream is over
+        self.queue: asyncio.Queue[Event | None] = asyncio.Queue(queue_size)
+
+    def close(self) -> None:
+        """End the stream after what is queued, or right away if the queue is full."""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class BroadcastHub:
+    """In-process fan-out of new posts, comments and like counts to streams.
+
+    Each subscriber has its own bounded queue. A subscriber whose queue is full
+    is evicted rather than slowing down publishers or growing without bound;
+    its client reconnects with Last-Event-ID and catches up from the last
+    ``history_size`` events. Like counts are coalesced: while the hub is
+    running, only the latest count of each post is published, every
+    ``like_interval_seconds``.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        history_size: int,
+        max_subscribers: int,
+        like_interval_seconds: float,
+    ) -> None:
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.like_interval_seconds = like_interval_seconds
+        self.published = 0
+        self.evicted = 0
+        self.coalesced_likes = 0
+        self.resets = 0
+        # Ids keep growing across restarts, so a Last-Event-ID from before a
+        # restart is older than the history instead of matching new events
+        self._last_id = time.time_ns() // 1000
+        self._history: deque[Event] = deque(maxlen=history_size)
+        self._subscribers: set[Subscriber] = set()
+        self._likes: dict[int, int] = {}
+        self._stopped = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_id
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._stopped = asyncio.Event()
+        self._task = asyncio.create_task(self._work(), name="broadcast-likes")
+
+    async def stop(self) -> None:
+        """Publish the pending like counts, then end every stream."""
+        if not self.running:
+            return
+        self._stopped.set()
+        await self._task
+        self._task = None
+        self.flush_likes()
+        for subscriber in self._subscribers:
+            subscriber.close()
+        self._subscribers.clear()
+
+    def subscribe(self, last_event_id: int | None = None) -> Subscriber | None:
+        """A new subscriber, or None when there are max_subscribers already.
+
+        With ``last_event_id``, the events after it are queued first. If they
+        are no longer all in the history, or would not fit in the queue, a
+        ``reset`` event is queued instead, telling the client to reload what it
+        shows.
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(self.queue_size)
+        if last_event_id is not None and last_event_id != self._last_id:
+            oldest = self._history[0].id if self._history else self._last_id + 1
+            missed = []
+            if oldest - 1 <= last_event_id < self._last_id:
+                missed = [event for event in self._history if event.id > last_event_id]
+            if not missed or len(missed) > self.queue_size:
+                self.resets += 1
+                missed = [Event(self._last_id, "reset", {})]
+            for event in missed:
+                subscriber.queue.put_nowait(event)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def publish(self, name: str, data: dict) -> None:
+        self._last_id += 1
+        event = Event(self._last_id, name, data)
+        self._history.append(event)
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning(
+                    "Evicting a subscriber %s events behind", self.queue_size
+                )
+                self.evicted += 1
+                self._subscribers.discard(subscriber)
+                subscriber.close()
+
+    def publish_like(self, post_id: int, likes: int) -> None:
+        """Publish the like count of a post, coalesced while the hub is running."""
+        if not self.running:
+            self.publish("like", {"post_id": post_id, "likes": likes})
+            return
+        if post_id in self._likes:
+            self.coalesced_likes += 1
+        self._likes[post_id] = likes
+
+    def flush_likes(self) -> None:
+        likes, self._likes = self._likes, {}
+        for post_id, count in likes.items():
+            self.publish("like", {"post_id": post_id, "likes": count})
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.like_interval_seconds)
+                return
+            except asyncio.TimeoutError:
+                self.flush_likes()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "evicted": self.evicted,
+            "coalesced_likes": self.coalesced_likes,
+            "resets": self.resets,
+        }
+
+
+broadcast_hub = BroadcastHub(
+    queue_size=config.BROADCAST_QUEUE_SIZE,
+    history_size=config.BROADCAST_HISTORY_SIZE,
+    max_subscribers=config.BROADCAST_MAX_SUBSCRIBERS,
+    like_interval_seconds=config.BROADCAST_LIKE_INTERVAL_SECONDS,
+)
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+class TTLCache:
+    """In-process LRU mapping whose entries expire ``ttl`` seconds after being set.
+
+    Not shared between workers, so keep ``ttl`` short for anything that can change.
+    A ``maxsize`` or ``ttl`` of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._data[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store ``value``; ``ttl`` can only shorten the cache-wide TTL."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time.
+
+    Callers arriving while a key is being computed wait for that result (or
+    exception) instead of starting their own, so an expired cache entry is
+    recomputed once rather than by every concurrent request. If the caller
+    computing it is cancelled, the ones waiting are not: one of them computes
+    it instead.
+    """
+
+    # What waiting callers get when the computation was cancelled
+    _retry = object()
+
+    def __init__(self) -> None:
+        self.shared = 0
+        self._flights: dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        while (flight := self._flights.get(key)) is not None:
+            self.shared += 1
+            result = await asyncio.shield(flight)
+            if result is not self._retry:
+                return result
+            self.shared -= 1
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            flight.set_result(self._retry)
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark the exception retrieved in case nobody else was waiting
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "shared": self.shared}
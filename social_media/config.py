@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,8 +12,77 @@ class BaseConfig(BaseSettings):
 class GlobalConfig(BaseConfig):
     DATABASE_URL: str | None = None
     DB_FORCE_ROLL_BACK: bool = False
+    # Reads go to DATABASE_READ_URL (a replica) or, for SQLite, to a pool of
+    # DATABASE_READ_POOL_SIZE read-only connections; 0 sends them to the writer
+    DATABASE_READ_URL: str | None = None
+    DATABASE_READ_POOL_SIZE: int = 4
     MAILGUN_API_KEY: str | None = None
     MAILGUN_DOMAIN: str | None = None
+    MAILGUN_BASE_URL: str = "https://api.mailgun.net/v3"
+    HTTP_CLIENT_TIMEOUT_SECONDS: float = 10
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 20
+    # Background mail queue, see tasks.MailDispatcher
+    MAIL_WORKERS: int = 2
+    MAIL_QUEUE_SIZE: int = 1000
+    MAIL_MAX_RETRIES: int = 3
+    MAIL_RETRY_BACKOFF_SECONDS: float = 1
+    MAIL_DRAIN_TIMEOUT_SECONDS: float = 10
+    # Serve the post read endpoints from plain dicts rendered by orjson
+    FAST_JSON_ENABLED: bool = True
+    # Whether post ids exist; posts are never deleted, misses expire sooner
+    POST_EXISTS_CACHE_MAX_SIZE: int = 100_000
+    POST_EXISTS_CACHE_TTL_SECONDS: float = 300
+    POST_MISSING_CACHE_TTL_SECONDS: float = 5
+    # Pages of GET /posts/post, dropped whenever a post or like is written
+    POST_LIST_CACHE_TTL_SECONDS: float = 5
+    POST_LIST_CACHE_MAX_SIZE: int = 256
+    # Buffer likes in memory and write them in batches, see like_buffer.py
+    LIKE_BUFFER_ENABLED: bool = False
+    LIKE_BUFFER_MAX_SIZE: int = 1000
+    LIKE_BUFFER_FLUSH_INTERVAL_SECONDS: float = 1
+    # Trending scores: likes weighted by recency, halving every HALF_LIFE_HOURS
+    # and recomputed every REFRESH_SECONDS, see trending.py
+    TRENDING_ENABLED: bool = True
+    TRENDING_REFRESH_SECONDS: float = 60
+    TRENDING_HALF_LIFE_HOURS: float = 6
+    TRENDING_MIN_SCORE: float = 0.05
+    # Home timelines: new posts are pushed to followers' timelines, except from
+    # authors with more followers than this, whose posts are read on request
+    TIMELINE_FANOUT_MAX_FOLLOWERS: int = 10_000
+    # Recent posts of a followed user copied into the follower's timeline
+    TIMELINE_BACKFILL_POSTS: int = 100
+    # Server-sent events from GET /events, see broadcast.py. QUEUE_SIZE is per
+    # subscriber; HISTORY_SIZE events are kept for clients resuming a stream
+    BROADCAST_QUEUE_SIZE: int = 256
+    BROADCAST_HISTORY_SIZE: int = 1000
+    BROADCAST_MAX_SUBSCRIBERS: int = 1000
+    BROADCAST_LIKE_INTERVAL_SECONDS: float = 0.5
+    BROADCAST_KEEPALIVE_SECONDS: float = 15
+    # Sampling profiles of requests sent with PROFILER_TOKEN in X-Profile-Token,
+    # or a SAMPLE_RATE share of all requests; see profiler.py
+    PROFILER_ENABLED: bool = False
+    PROFILER_TOKEN: str | None = None
+    PROFILER_SAMPLE_RATE: float = 0
+    PROFILER_INTERVAL_SECONDS: float = 0.005
+    PROFILER_MAX_BYTES: int = 8 * 1024 * 1024
+    # Format and write app logs on a listener thread instead of the event loop
+    LOG_QUEUE_ENABLED: bool = False
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_QUEUE_OVERFLOW: Literal["drop", "block"] = "drop"
+    # Pragmas applied to every SQLite connection, see sqlite_tuning.py
+    SQLITE_TUNING_ENABLED: bool = True
+    SQLITE_JOURNAL_MODE: Literal["DELETE", "TRUNCATE", "PERSIST", "WAL"] = "WAL"
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    SQLITE_CACHE_SIZE: int = -64000  # negative: KiB, i.e. 64 MiB
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_TEMP_STORE: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+    # bcrypt runs in its own threads; calls beyond MAX_PENDING get a 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # Per-process cache of authenticated users, 0 disables it
+    USER_CACHE_TTL_SECONDS: float = 30
+    USER_CACHE_MAX_SIZE: int = 1024
 
 
 class DevConfig(GlobalConfig):
@@ -2,6 +2,9 @@ import databases
 import sqlalchemy
 
 from social_media.config import config
+from social_media.migrations import migrate
+from social_media.read_pool import SQLiteReadDatabase
+from social_media.sqlite_tuning import sqlite_pragmas, tuned_connection_factory
 
 # Create all tables
 metadata = sqlalchemy.MetaData()
@@ -13,6 +16,18 @@ user_table = sqlalchemy.Table(
     sqlalchemy.Column("email", sqlalchemy.String, unique=True),
     sqlalchemy.Column("password", sqlalchemy.String),
     sqlalchemy.Column("confirmed", sqlalchemy.Boolean, default=False),
+    # Denormalized count of rows in follows, kept in step by the follow endpoints
+    sqlalchemy.Column(
+        "follower_count", sqlalchemy.Integer, nullable=False, server_default="0"
+    ),
+    # Set for good once an author has too many followers to push posts to,
+    # see timeline.py
+    sqlalchemy.Column(
+        "fan_out_on_read",
+        sqlalchemy.Boolean,
+        nullable=False,
+        server_default=sqlalchemy.false(),
+    ),
 )
 
 post_table = sqlalchemy.Table(
@@ -21,6 +36,18 @@ post_table = sqlalchemy.Table(
     sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
     sqlalchemy.Column("body", sqlalchemy.String),
     sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id"), nullable=True),
+    # Denormalized count of rows in likes, kept in step by like_post.
+    sqlalchemy.Column(
+        "like_count", sqlalchemy.Integer, nullable=False, server_default="0"
+    ),
+    sqlalchemy.Column(
+        "created_at",
+        sqlalchemy.DateTime,
+        nullable=False,
+        server_default=sqlalchemy.func.current_timestamp(),
+    ),
+    sqlalchemy.Index("ix_posts_like_count_id", "like_count", "id"),
+    sqlalchemy.Index("ix_posts_user_id_id", "user_id", "id"),
 )
 
 comment_table = sqlalchemy.Table(
@@ -30,6 +57,7 @@ comment_table = sqlalchemy.Table(
     sqlalchemy.Column("body", sqlalchemy.String),
     sqlalchemy.Column("post_id", sqlalchemy.ForeignKey("posts.id"), nullable=False),
     sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id"), nullable=True),
+    sqlalchemy.Index("ix_comments_post_id_id", "post_id", "id"),
 )
 
 like_table = sqlalchemy.Table(
@@ -38,16 +66,149 @@ like_table = sqlalchemy.Table(
     sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
     sqlalchemy.Column("post_id", sqlalchemy.ForeignKey("posts.id"), nullable=False),
     sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id"), nullable=True),
+    sqlalchemy.Column(
+        "created_at",
+        sqlalchemy.DateTime,
+        nullable=False,
+        server_default=sqlalchemy.func.current_timestamp(),
+    ),
+    sqlalchemy.Index("uq_likes_post_id_user_id", "post_id", "user_id", unique=True),
+    sqlalchemy.Index("ix_likes_user_id", "user_id"),
 )
 
+follow_table = sqlalchemy.Table(
+    "follows",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("follower_id", sqlalchemy.ForeignKey("users.id"), nullable=False),
+    sqlalchemy.Column("followee_id", sqlalchemy.ForeignKey("users.id"), nullable=False),
+    sqlalchemy.Column(
+        "created_at",
+        sqlalchemy.DateTime,
+        nullable=False,
+        server_default=sqlalchemy.func.current_timestamp(),
+    ),
+    sqlalchemy.Index(
+        "uq_follows_follower_id_followee_id", "follower_id", "followee_id", unique=True
+    ),
+    sqlalchemy.Index(
+        "ix_follows_followee_id_follower_id", "followee_id", "follower_id"
+    ),
+)
+
+# Home timeline of each user: the ids of posts pushed to them on write.
+# Clustered by (user_id, post_id), so a page is a single range read.
+timeline_table = sqlalchemy.Table(
+    "timelines",
+    metadata,
+    sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id"), primary_key=True),
+    sqlalchemy.Column("post_id", sqlalchemy.ForeignKey("posts.id"), primary_key=True),
+    sqlite_with_rowid=False,
+)
+
+# Trending score of each post, kept up to date by trending.TrendingRanker.
+# Scores are stored relative to trending_state.epoch, see trending.py.
+post_trending_table = sqlalchemy.Table(
+    "post_trending",
+    metadata,
+    sqlalchemy.Column("post_id", sqlalchemy.ForeignKey("posts.id"), primary_key=True),
+    sqlalchemy.Column("score", sqlalchemy.Float, nullable=False),
+    sqlalchemy.Index("ix_post_trending_score_post_id", "score", "post_id"),
+)
+
+trending_state_table = sqlalchemy.Table(
+    "trending_state",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    # Likes up to this id are already part of the scores
+    sqlalchemy.Column("last_like_id", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("epoch", sqlalchemy.Float, nullable=False),
+)
+
+# Full-text indexes over post and comment bodies. They are external-content
+# FTS5 tables: the text lives in posts/comments, and triggers index new rows.
+search_index_ddl = [
+    (
+        "CREATE VIRTUAL TABLE posts_fts USING fts5("
+        "body, content='posts', content_rowid='id', tokenize='porter unicode61')"
+    ),
+    (
+        "CREATE VIRTUAL TABLE comments_fts USING fts5("
+        "body, content='comments', content_rowid='id', tokenize='porter unicode61')"
+    ),
+    (
+        "CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN "
+        "INSERT INTO posts_fts (rowid, body) VALUES (new.id, new.body); END"
+    ),
+    (
+        "CREATE TRIGGER comments_fts_insert AFTER INSERT ON comments BEGIN "
+        "INSERT INTO comments_fts (rowid, body) VALUES (new.id, new.body); END"
+    ),
+]
+for statement in search_index_ddl:
+    sqlalchemy.event.listen(metadata, "after_create", sqlalchemy.DDL(statement))
+
+posts_fts = sqlalchemy.table("posts_fts", sqlalchemy.column("rowid"))
+comments_fts = sqlalchemy.table("comments_fts", sqlalchemy.column("rowid"))
+rebuild_search_index_queries = [
+    "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')",
+    "INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')",
+]
+
+count_likes_of_post = (
+    sqlalchemy.select(sqlalchemy.func.count(like_table.c.id))
+    .where(like_table.c.post_id == post_table.c.id)
+    .scalar_subquery()
+)
+
+# Recompute posts.like_count from likes for every post that has drifted
+reconcile_like_counts_query = (
+    post_table.update()
+    .where(post_table.c.like_count != count_likes_of_post)
+    .values(like_count=count_likes_of_post)
+)
+
+
+def sqlite_connect_args() -> dict:
+    """Extra ``sqlite3.connect`` arguments applying the tuning profile."""
+    if not config.SQLITE_TUNING_ENABLED or not config.DATABASE_URL.startswith(
+        "sqlite"
+    ):
+        return {}
+    return {"factory": tuned_connection_factory(sqlite_pragmas(config))}
+
 
 # Create database object
 engine = sqlalchemy.create_engine(
-    url=config.DATABASE_URL, connect_args={"check_same_thread": False}
+    url=config.DATABASE_URL,
+    connect_args={"check_same_thread": False, **sqlite_connect_args()},
 )
 
-metadata.create_all(engine)
+with engine.begin() as connection:
+    migrate(connection, metadata)
 
 database = databases.Database(
-    url=config.DATABASE_URL, force_rollback=config.DB_FORCE_ROLL_BACK
+    url=config.DATABASE_URL,
+    force_rollback=config.DB_FORCE_ROLL_BACK,
+    **sqlite_connect_args(),
 )
+
+
+def create_read_database() -> databases.Database:
+    """Database for the read-only queries, falling back to the writer."""
+    if config.DB_FORCE_ROLL_BACK:
+        # Writes rolled back at the end of a test are invisible to other connections
+        return database
+    url = databases.DatabaseURL(config.DATABASE_READ_URL or config.DATABASE_URL)
+    if url.dialect == "sqlite":
+        if config.DATABASE_READ_POOL_SIZE <= 0 or url.database in ("", ":memory:"):
+            return database
+        return SQLiteReadDatabase(
+            url, pool_size=config.DATABASE_READ_POOL_SIZE, **sqlite_connect_args()
+        )
+    if config.DATABASE_READ_URL:
+        return databases.Database(url)
+    return database
+
+
+read_database = create_read_database()
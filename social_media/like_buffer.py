@@ -0,0 +1,151 @@
+import asyncio
+import logging
+
+import sqlalchemy
+from sqlalchemy.dialects import sqlite
+
+from social_media import sql
+from social_media.broadcast import broadcast_hub
+from social_media.config import config
+from social_media.database import database, like_table, post_table
+
+logger = logging.getLogger(__name__)
+
+
+class LikeBuffer:
+    """Write-behind buffer for likes, flushed in batches by a background task.
+
+    Likes are de-duplicated per ``(post_id, user_id)`` in memory and inserted
+    with ON CONFLICT DO NOTHING, so flushing a like that is already stored is a
+    no-op. Until a like is flushed, ``pending_likes`` reports it so reads can
+    add it to the stored like count.
+    """
+
+    def __init__(self, max_size: int, flush_interval_seconds: float) -> None:
+        self.max_size = max_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flushed = 0
+        self.duplicates = 0
+        self.failed_flushes = 0
+        self._pending: dict[tuple[int, int], None] = {}
+        self._flushing: dict[tuple[int, int], None] = {}
+        self._counts: dict[int, int] = {}
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._work(), name="like-buffer")
+
+    async def stop(self) -> None:
+        """Stop the background task, then flush whatever is still buffered."""
+        if not self.running:
+            return
+        self._stopping = True
+        self._full.set()
+        await self._task
+        self._task = None
+        await self.flush()
+
+    def add(self, post_id: int, user_id: int) -> bool:
+        """Buffer a like, returning False if it is already waiting to be flushed."""
+        key = (post_id, user_id)
+        if key in self._pending or key in self._flushing:
+            self.duplicates += 1
+            return False
+        self._pending[key] = None
+        self._counts[post_id] = self._counts.get(post_id, 0) + 1
+        if len(self._pending) >= self.max_size:
+            self._full.set()
+        return True
+
+    def pending_likes(self, post_id: int) -> int:
+        return self._counts.get(post_id, 0)
+
+    async def flush(self) -> int:
+        """Write the buffered likes in one transaction, returning how many were new."""
+        if not self._pending or self._flushing:
+            return 0
+        self._flushing, self._pending = self._pending, {}
+        rows = [
+            {"post_id": post_id, "user_id": user_id}
+            for post_id, user_id in self._flushing
+        ]
+        counts = []
+        try:
+            async with database.transaction():
+                inserted = []
+                # Chunked to stay well under SQLite's limit on bound parameters
+                for i in range(0, len(rows), 500):
+                    insert_query = (
+                        sqlite.insert(like_table)
+                        .values(rows[i : i + 500])
+                        .on_conflict_do_nothing()
+                        .returning(like_table.c.post_id)
+                    )
+                    inserted += await sql.fetch_all(insert_query)
+                added: dict[int, int] = {}
+                for row in inserted:
+                    added[row.post_id] = added.get(row.post_id, 0) + 1
+                if added:
+                    count_query = (
+                        post_table.update()
+                        .where(post_table.c.id.in_(list(added)))
+                        .values(
+                            like_count=post_table.c.like_count
+                            + sqlalchemy.case(added, value=post_table.c.id, else_=0)
+                        )
+                        .returning(post_table.c.id, post_table.c.like_count)
+                    )
+                    counts = await sql.fetch_all(count_query)
+        except Exception:
+            logger.exception("Flushing %s buffered likes failed", len(rows))
+            self.failed_flushes += 1
+            self._pending = {**self._flushing, **self._pending}
+            self._flushing = {}
+            return 0
+        for post_id, _ in self._flushing:
+            self._counts[post_id] -= 1
+            if not self._counts[post_id]:
+                del self._counts[post_id]
+        self._flushing = {}
+        self.flushed += len(inserted)
+        for row in counts:
+            broadcast_hub.publish_like(row.id, row.like_count)
+        logger.debug("Flushed %s buffered likes", len(inserted))
+        return len(inserted)
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+            if self._stopping:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": len(self._pending) + len(self._flushing),
+            "max_size": self.max_size,
+            "flushed": self.flushed,
+            "duplicates": self.duplicates,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+like_buffer = LikeBuffer(
+    max_size=config.LIKE_BUFFER_MAX_SIZE,
+    flush_interval_seconds=config.LIKE_BUFFER_FLUSH_INTERVAL_SECONDS,
+)
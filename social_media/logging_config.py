@@ -1,8 +1,12 @@
 import logging
+import queue
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
 
 from social_media.config import DevConfig, config
 
+log_listener: QueueListener | None = None
+
 
 def obfuscated(email: str, obfuscated_length: int) -> str:
     characters_to_keep = email[:obfuscated_length]
@@ -21,7 +25,100 @@ class EmailObfuscationFilter(logging.Filter):
         return True
 
 
+class BoundedQueueHandler(QueueHandler):
+    """Hands records to a listener thread; when the queue is full either drops
+    and counts them (``overflow="drop"``) or blocks the caller (``"block"``)."""
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop") -> None:
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BoundedQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The default put_nowait fails when the bounded queue is full
+        self.queue.put(self._sentinel)
+
+
+class UnfilteredHandler(logging.Handler):
+    """Emits through ``handler`` without running its filters again.
+
+    The handler itself is left as it is, as other loggers may share it.
+    """
+
+    def __init__(self, handler: logging.Handler) -> None:
+        super().__init__(handler.level)
+        self.handler = handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handler.acquire()
+        try:
+            self.handler.emit(record)
+        finally:
+            self.handler.release()
+
+
+def start_log_listener(logger: logging.Logger) -> QueueListener:
+    """Move the handlers of ``logger`` behind a queue served by a listener thread.
+
+    Filters run on the calling side: the correlation id lives in a context
+    variable that the listener thread cannot see.
+    """
+    handlers = logger.handlers[:]
+    queue_handler = BoundedQueueHandler(
+        queue.Queue(maxsize=config.LOG_QUEUE_SIZE), config.LOG_QUEUE_OVERFLOW
+    )
+    for handler in handlers:
+        for _filter in handler.filters:
+            if _filter not in queue_handler.filters:
+                queue_handler.addFilter(_filter)
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    listener = BoundedQueueListener(
+        queue_handler.queue,
+        *(UnfilteredHandler(handler) for handler in handlers),
+        respect_handler_level=True,
+    )
+    listener.start()
+    return listener
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread, if any."""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+
+def logging_stats() -> dict:
+    queue_handlers = [
+        handler
+        for handler in logging.getLogger("social_media").handlers
+        if isinstance(handler, BoundedQueueHandler)
+    ]
+    if not queue_handlers:
+        return {"queued": False}
+    return {
+        "queued": True,
+        "size": queue_handlers[0].queue.qsize(),
+        "dropped": queue_handlers[0].dropped,
+    }
+
+
 def configure_logging() -> None:
+    global log_listener
+    stop_logging()
     dictConfig(
         {
             "version": 1,
@@ -88,3 +185,5 @@ def configure_logging() -> None:
             },
         }
     )
+    if config.LOG_QUEUE_ENABLED:
+        log_listener = start_log_listener(logging.getLogger("social_media"))
@@ -2,13 +2,28 @@ import logging
 from contextlib import asynccontextmanager
 
 from asgi_correlation_id import CorrelationIdMiddleware
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, status
 from fastapi.exception_handlers import http_exception_handler
+from fastapi.responses import JSONResponse
 
-from social_media.database import database
-from social_media.logging_config import configure_logging
+from social_media.broadcast import broadcast_hub
+from social_media.config import config
+from social_media.database import database, read_database
+from social_media.executor import ExecutorSaturatedError
+from social_media.like_buffer import like_buffer
+from social_media.logging_config import configure_logging, stop_logging
+from social_media.metrics import MetricsMiddleware
+from social_media.profiler import ProfilerMiddleware, profiler
+from social_media.routers.events import router as events_router
+from social_media.routers.metrics import router as metrics_router
 from social_media.routers.post import router as post_router
+from social_media.routers.profiles import router as profiles_router
+from social_media.routers.search import router as search_router
+from social_media.routers.stats import router as stats_router
 from social_media.routers.user import router as user_router
+from social_media.security import password_hashing_pool
+from social_media.tasks import close_http_client, mail_dispatcher, open_http_client
+from social_media.trending import trending_ranker
 
 logger = logging.getLogger(__name__)
 
@@ -17,20 +32,57 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     configure_logging()
     await database.connect()
+    await read_database.connect()
+    open_http_client()
+    await mail_dispatcher.start()
+    await broadcast_hub.start()
+    if config.LIKE_BUFFER_ENABLED:
+        await like_buffer.start()
+    if config.TRENDING_ENABLED:
+        await trending_ranker.start()
+    if config.PROFILER_ENABLED:
+        await profiler.start()
     yield
+    await profiler.stop()
+    await trending_ranker.stop()
+    await like_buffer.stop()
+    await broadcast_hub.stop()
+    await mail_dispatcher.stop(timeout=config.MAIL_DRAIN_TIMEOUT_SECONDS)
+    await close_http_client()
+    await read_database.disconnect()
     await database.disconnect()
+    password_hashing_pool.shutdown()
+    stop_logging()
 
 
 app = FastAPI(lifespan=lifespan)
 
+# Innermost, so the correlation id is set before a profile is keyed by it
+app.add_middleware(ProfilerMiddleware, excluded_prefix="/profiles")
 app.add_middleware(CorrelationIdMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(router=post_router, prefix="/posts", tags=["posts"])
 app.include_router(router=user_router, prefix="/users", tags=["users"])
+app.include_router(router=search_router, prefix="/search", tags=["search"])
+app.include_router(router=events_router, prefix="/events", tags=["events"])
+app.include_router(router=stats_router, prefix="/stats", tags=["stats"])
+app.include_router(router=metrics_router, prefix="/metrics", tags=["stats"])
+app.include_router(router=profiles_router, prefix="/profiles", tags=["stats"])
 
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler_loggin(request, exc):
     logger.error(f"HTTP exception: {exc.status_code} {exc.detail}")
     return await http_exception_handler(request, exc)
+
+
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request, exc):
+    logger.error(f"Rejected request: {exc}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry later"},
+        headers={"Retry-After": "1"},
+    )
@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import logging
+
+from social_media import sql
+from social_media.database import (
+    database,
+    post_table,
+    rebuild_search_index_queries,
+    reconcile_like_counts_query,
+)
+from social_media.logging_config import configure_logging
+from social_media.trending import trending_ranker
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_like_counts() -> int:
+    """Recompute posts.like_count from likes, returning how many posts drifted."""
+    logger.info("Reconciling like counts")
+    # A single UPDATE, so the scan runs under the write lock: counting the
+    # drifted posts first would leave a read to upgrade, which fails with
+    # "database is locked" if a like commits meanwhile.
+    query = reconcile_like_counts_query.returning(post_table.c.id)
+    drifted = len(await sql.fetch_all(query))
+    logger.info("Reconciled like count of %s posts", drifted)
+    return drifted
+
+
+async def rebuild_search_index() -> None:
+    """Reindex every post and comment body, e.g. after importing rows by hand."""
+    logger.info("Rebuilding search index")
+    async with database.transaction():
+        for query in rebuild_search_index_queries:
+            await sql.execute(query)
+    logger.info("Rebuilt search index")
+
+
+async def refresh_trending() -> None:
+    """Score new likes once, for deployments running with TRENDING_ENABLED off."""
+    logger.info("Refreshing trending scores")
+    await trending_ranker.refresh()
+    logger.info("Refreshed trending scores up to like %s", trending_ranker.last_like_id)
+
+
+commands = {
+    "reconcile-likes": reconcile_like_counts,
+    "rebuild-search": rebuild_search_index,
+    "refresh-trending": refresh_trending,
+}
+
+
+async def run(command: str) -> None:
+    await database.connect()
+    try:
+        await commands[command]()
+    finally:
+        await database.disconnect()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m social_media.maintenance")
+    parser.add_argument("command", choices=commands)
+    args = parser.parse_args(argv)
+    configure_logging()
+    asyncio.run(run(args.command))
+
+
+if __name__ == "__main__":
+    main()
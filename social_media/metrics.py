@@ -0,0 +1,202 @@
+"""In-process metrics, exposed in the Prometheus text format by GET /metrics.
+
+Values are only recorded from the event loop thread, so series are plain lists
+and dicts updated without locks: recording is a dict lookup, a bisect and a
+couple of additions. Work timed inside worker threads (bcrypt) returns its
+duration to the loop to be recorded there. Each worker process has its own
+registry and reports its own numbers.
+"""
+
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from typing import TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+T = TypeVar("T")
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+SLOW_CALL_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series: dict[tuple, object] = {}
+        registry.append(self)
+
+    def clear(self) -> None:
+        self.series.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, value in self.series.items():
+            lines.append(f"{self.name}{format_labels(self.labels, values)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    """Counts per bucket, with the sum of all observations in the last slot."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = REQUEST_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            # One slot per bucket, one for +Inf, then the sum
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, series in self.series.items():
+            count = 0
+            for bound, bucket in zip((*self.buckets, "+Inf"), series):
+                count += bucket
+                labels = format_labels(self.labels, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+registry: list[Metric] = []
+
+
+def render() -> str:
+    return "\n".join(line for metric in registry for line in metric.render()) + "\n"
+
+
+def measured(func: Callable[..., T], *args) -> tuple[T, float]:
+    """Call ``func`` and return its result with how long it took, in seconds."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+requests_total = Counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")
+)
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle an HTTP request, until its response is sent",
+    ("method", "route"),
+)
+# By method only: the route is not known until the router has matched it
+requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests being handled", ("method",)
+)
+query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Time spent in a database call, by statement kind and tables",
+    ("query",),
+    buckets=QUERY_BUCKETS,
+)
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt time in the password hashing pool, excluding time queued",
+    ("operation",),
+    buckets=SLOW_CALL_BUCKETS,
+)
+mailgun_duration = Histogram(
+    "mailgun_request_duration_seconds",
+    "Time for a Mailgun API call, by response status",
+    ("status",),
+    buckets=SLOW_CALL_BUCKETS,
+)
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route of a request with its parameters, e.g. /posts/post/{post_id}.
+
+    Routes of an included router do not know the prefix they were included
+    with, so the template is rebuilt from the request path instead.
+    """
+    if "route" not in scope:
+        return "unmatched"
+    params = {str(value): name for name, value in scope["path_params"].items()}
+    return "/".join(
+        f"{{{params[segment]}}}" if segment in params else segment
+        for segment in scope["path"].split("/")
+    )
+
+
+class MetricsMiddleware:
+    """Counts and times HTTP requests by route template, e.g. /posts/post/{post_id}.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so responses are
+    neither buffered nor run in another task.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_flight.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.dec(method)
+            route = route_template(scope)
+            requests_total.inc(method, route, status)
+            request_duration.observe(elapsed, method, route)
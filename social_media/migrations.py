@@ -0,0 +1,193 @@
+"""Versioned schema migrations.
+
+New databases are created from the table definitions and stamped with the
+latest version; existing ones only run the migrations they have not seen yet.
+Migrations are plain SQL so they keep describing the schema of their version.
+"""
+
+import logging
+from collections.abc import Callable
+
+import sqlalchemy
+
+logger = logging.getLogger(__name__)
+
+Migration = Callable[[sqlalchemy.Connection], None]
+
+migrations: list[tuple[int, Migration]] = []
+
+
+def migration(version: int) -> Callable[[Migration], Migration]:
+    def register(func: Migration) -> Migration:
+        migrations.append((version, func))
+        return func
+
+    return register
+
+
+def execute(connection: sqlalchemy.Connection, *statements: str) -> None:
+    for statement in statements:
+        connection.execute(sqlalchemy.text(statement))
+
+
+# Grouped backfill: one pass over likes instead of a correlated count per post.
+backfill_like_counts = (
+    "UPDATE posts SET like_count = counts.likes FROM "
+    "(SELECT post_id, count(id) AS likes FROM likes GROUP BY post_id) AS counts "
+    "WHERE counts.post_id = posts.id"
+)
+
+
+def latest_version() -> int:
+    return max((version for version, _ in migrations), default=0)
+
+
+def get_version(connection: sqlalchemy.Connection) -> int | None:
+    if not sqlalchemy.inspect(connection).has_table("schema_version"):
+        return None
+    return connection.execute(
+        sqlalchemy.text("SELECT version FROM schema_version")
+    ).scalar_one()
+
+
+def set_version(connection: sqlalchemy.Connection, version: int) -> None:
+    if get_version(connection) is None:
+        execute(connection, "CREATE TABLE schema_version (version INTEGER NOT NULL)")
+        connection.execute(
+            sqlalchemy.text("INSERT INTO schema_version (version) VALUES (:version)"),
+            {"version": version},
+        )
+    else:
+        connection.execute(
+            sqlalchemy.text("UPDATE schema_version SET version = :version"),
+            {"version": version},
+        )
+
+
+def migrate(
+    connection: sqlalchemy.Connection,
+    metadata: sqlalchemy.MetaData,
+    target: int | None = None,
+) -> int:
+    """Bring the database up to ``target`` (default: latest) and return its version."""
+    target = latest_version() if target is None else target
+    if not sqlalchemy.inspect(connection).has_table("users"):
+        logger.info(f"Creating database schema at version {target}")
+        metadata.create_all(connection)
+        set_version(connection, target)
+        return target
+
+    current = get_version(connection) or 0
+    for version, func in sorted(migrations, key=lambda item: item[0]):
+        if current < version <= target:
+            logger.info(f"Applying migration {version}: {func.__doc__}")
+            func(connection)
+            set_version(connection, version)
+            current = version
+    return current
+
+
+@migration(1)
+def add_post_like_count(connection: sqlalchemy.Connection) -> None:
+    """Add and backfill the denormalized posts.like_count column."""
+    columns = sqlalchemy.inspect(connection).get_columns("posts")
+    if "like_count" in {column["name"] for column in columns}:
+        return
+    execute(
+        connection,
+        "ALTER TABLE posts ADD COLUMN like_count INTEGER NOT NULL DEFAULT 0",
+        backfill_like_counts,
+    )
+
+
+@migration(2)
+def add_foreign_key_indexes(connection: sqlalchemy.Connection) -> None:
+    """Index comments and likes by post and user, and posts by like count."""
+    execute(
+        connection,
+        "CREATE INDEX IF NOT EXISTS ix_comments_post_id_id ON comments (post_id, id)",
+        "CREATE INDEX IF NOT EXISTS ix_likes_user_id ON likes (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_like_count_id ON posts (like_count, id)",
+        # A user may like a post only once; drop duplicates before enforcing it.
+        "DELETE FROM likes WHERE user_id IS NOT NULL AND id NOT IN "
+        "(SELECT min(id) FROM likes WHERE user_id IS NOT NULL "
+        "GROUP BY post_id, user_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_likes_post_id_user_id "
+        "ON likes (post_id, user_id)",
+        "UPDATE posts SET like_count = 0",
+        backfill_like_counts,
+    )
+
+
+@migration(3)
+def add_search_index(connection: sqlalchemy.Connection) -> None:
+    """Index post and comment bodies for full-text search."""
+    execute(
+        connection,
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+        "body, content='posts', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5("
+        "body, content='comments', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN "
+        "INSERT INTO posts_fts (rowid, body) VALUES (new.id, new.body); END",
+        "CREATE TRIGGER IF NOT EXISTS comments_fts_insert AFTER INSERT ON comments "
+        "BEGIN INSERT INTO comments_fts (rowid, body) VALUES (new.id, new.body); END",
+        "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')",
+        "INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')",
+    )
+
+
+@migration(4)
+def add_created_at_and_trending(connection: sqlalchemy.Connection) -> None:
+    """Timestamp posts and likes, and add the trending score tables."""
+    columns = sqlalchemy.inspect(connection).get_columns("posts")
+    if "created_at" not in {column["name"] for column in columns}:
+        # SQLite cannot add a column defaulting to CURRENT_TIMESTAMP to a table
+        # with rows, so existing rows are backfilled and a trigger stamps new ones.
+        for table in ("posts", "likes"):
+            execute(
+                connection,
+                f"ALTER TABLE {table} ADD COLUMN created_at DATETIME",
+                f"UPDATE {table} SET created_at = CURRENT_TIMESTAMP",
+                f"CREATE TRIGGER IF NOT EXISTS {table}_created_at AFTER INSERT ON "
+                f"{table} WHEN new.created_at IS NULL BEGIN UPDATE {table} "
+                "SET created_at = CURRENT_TIMESTAMP WHERE id = new.id; END",
+            )
+    execute(
+        connection,
+        "CREATE TABLE IF NOT EXISTS post_trending ("
+        "post_id INTEGER NOT NULL PRIMARY KEY REFERENCES posts (id), "
+        "score FLOAT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_post_trending_score_post_id "
+        "ON post_trending (score, post_id)",
+        "CREATE TABLE IF NOT EXISTS trending_state (id INTEGER NOT NULL PRIMARY KEY, "
+        "last_like_id INTEGER NOT NULL, epoch FLOAT NOT NULL)",
+    )
+
+
+@migration(5)
+def add_follows_and_timelines(connection: sqlalchemy.Connection) -> None:
+    """Add follows and materialized home timelines."""
+    columns = sqlalchemy.inspect(connection).get_columns("users")
+    if "follower_count" not in {column["name"] for column in columns}:
+        execute(
+            connection,
+            "ALTER TABLE users ADD COLUMN follower_count INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE users ADD COLUMN fan_out_on_read BOOLEAN NOT NULL DEFAULT 0",
+        )
+    execute(
+        connection,
+        "CREATE INDEX IF NOT EXISTS ix_posts_user_id_id ON posts (user_id, id)",
+        "CREATE TABLE IF NOT EXISTS follows (id INTEGER NOT NULL PRIMARY KEY, "
+        "follower_id INTEGER NOT NULL REFERENCES users (id), "
+        "followee_id INTEGER NOT NULL REFERENCES users (id), "
+        "created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_follows_follower_id_followee_id "
+        "ON follows (follower_id, followee_id)",
+        "CREATE INDEX IF NOT EXISTS ix_follows_followee_id_follower_id "
+        "ON follows (followee_id, follower_id)",
+        "CREATE TABLE IF NOT EXISTS timelines ("
+        "user_id INTEGER NOT NULL REFERENCES users (id), "
+        "post_id INTEGER NOT NULL REFERENCES posts (id), "
+        "PRIMARY KEY (user_id, post_id)) WITHOUT ROWID",
+    )
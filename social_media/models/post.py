@@ -16,6 +16,21 @@ class UserPostWithLikes(UserPost):
     likes: int
 
 
+class UserPostPage(BaseModel):
+    posts: list[UserPostWithLikes]
+    next_cursor: str | None = None
+
+
+class UserPostSearchHit(UserPostWithLikes):
+    # bm25 score of the best matching post or comment body, lower is better
+    rank: float
+
+
+class UserPostSearchPage(BaseModel):
+    posts: list[UserPostSearchHit]
+    next_cursor: str | None = None
+
+
 class CommentIn(BaseModel):
     body: str
     post_id: int
@@ -27,15 +42,36 @@ class Comment(CommentIn):
     user_id: int
 
 
+class CommentPage(BaseModel):
+    comments: list[Comment]
+    next_cursor: str | None = None
+
+
 class UserPostWithComments(BaseModel):
     post: UserPostWithLikes
     comments: list[Comment]
+    next_cursor: str | None = None
+
+
+class UserPostBatchItem(UserPostWithLikes):
+    comment_count: int | None = None
+    comments: list[Comment] | None = None
+
+
+class UserPostBatch(BaseModel):
+    posts: list[UserPostBatchItem]
+    missing: list[int]
 
 
 class PostLikeIn(BaseModel):
     post_id: int
 
 
+class BulkCreated(BaseModel):
+    ids: list[int]
+
+
 class PostLike(PostLikeIn):
-    id: int
+    # None while the like waits in the write-behind buffer
+    id: int | None
     user_id: int
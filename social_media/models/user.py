@@ -8,3 +8,8 @@ class User(BaseModel):
 
 class UserIn(User):
     password: str
+
+
+class Follow(BaseModel):
+    follower_id: int
+    followee_id: int
@@ -0,0 +1,31 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+
+
+def invalid_cursor_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+    )
+
+
+def encode_cursor(**position) -> str:
+    """Pack the sort key of the last row of a page into an opaque token."""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, **fields: type) -> dict:
+    """Unpack a cursor, checking that every field in ``fields`` has the given type."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError as e:
+        raise invalid_cursor_exception() from e
+    if not isinstance(position, dict):
+        raise invalid_cursor_exception()
+    for name, _type in fields.items():
+        if not isinstance(position.get(name), _type):
+            raise invalid_cursor_exception()
+    return position
@@ -0,0 +1,349 @@
+"""On-demand sampling profiles of single requests, keyed by correlation id.
+
+A request is profiled when it carries PROFILER_TOKEN in the X-Profile-Token
+header, or when it is picked at PROFILER_SAMPLE_RATE. While any request is
+being profiled, a thread wakes every ``interval_seconds`` and records the
+stack of each one: the stack of the event loop thread when the request's
+task is the one running, or else the chain of coroutines the task is
+suspended in, so time spent awaiting the database or the bcrypt pool shows
+up as well. With no request being profiled the thread sleeps, so the
+profiler costs nothing until it is asked for.
+
+Profiles are kept in folded-stack format (``frame;frame;frame count`` per
+line), which flamegraph.pl, inferno and speedscope read as is, and are
+dropped oldest first once they take more than ``max_bytes``.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from types import FrameType
+
+from asgi_correlation_id import correlation_id
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from social_media.config import config
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = b"x-profile-token"
+
+
+@lru_cache(maxsize=1024)
+def short_filename(filename: str) -> str:
+    """A source path relative to the sys.path entry it was imported from."""
+    prefixes = [path for path in sys.path if path and filename.startswith(path)]
+    if not prefixes:
+        return filename
+    return os.path.relpath(filename, max(prefixes, key=len))
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = short_filename(code.co_filename)
+    # co_qualname is new in Python 3.11
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})"
+
+
+def running_stack(frame: FrameType, root_code) -> list[str]:
+    """Labels of ``frame`` and its callers, outermost first, from ``root_code`` on."""
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()
+    for i, frame in enumerate(stack):
+        if frame.f_code is root_code:
+            stack = stack[i:]
+            break
+    return [frame_label(frame) for frame in stack]
+
+
+def awaiting_stack(coroutine) -> list[str]:
+    """Labels of a suspended coroutine and the ones it awaits, outermost first."""
+    stack = []
+    while coroutine is not None:
+        frame = getattr(coroutine, "cr_frame", None) or getattr(
+            coroutine, "gi_frame", None
+        )
+        if frame is None:
+            break
+        stack.append(frame_label(frame))
+        coroutine = getattr(coroutine, "cr_await", None) or getattr(
+            coroutine, "gi_yieldfrom", None
+        )
+    return stack
+
+
+class Profile:
+    __slots__ = (
+        "duration",
+        "folded",
+        "id",
+        "method",
+        "path",
+        "running_samples",
+        "sample_count",
+        "samples",
+        "started_at",
+        "status",
+        "task",
+    )
+
+    def __init__(self, id: str, method: str, path: str, task: asyncio.Task) -> None:
+        self.id = id
+        self.method = method
+        self.path = path
+        self.task = task
+        self.started_at = time.time()
+        self.status: int | None = None
+        self.duration = 0.0
+        self.samples: Counter[str] = Counter()
+        self.sample_count = 0
+        # Samples taken while the request's own code was running
+        self.running_samples = 0
+        self.folded = b""
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration * 1000,
+            "samples": self.sample_count,
+            "running_samples": self.running_samples,
+            "bytes": len(self.folded),
+        }
+
+
+class ProfileStore:
+    """Finished profiles by correlation id, at most ``max_bytes`` of them."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.stored = 0
+        self.evicted = 0
+        self.rejected = 0
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+
+    def add(self, profile: Profile) -> bool:
+        """Keep ``profile``, dropping the oldest ones to make room for it."""
+        size = len(profile.folded)
+        if size > self.max_bytes:
+            self.rejected += 1
+            return False
+        self.remove(profile.id)
+        while self.bytes + size > self.max_bytes:
+            _, oldest = self._profiles.popitem(last=False)
+            self.bytes -= len(oldest.folded)
+            self.evicted += 1
+        self._profiles[profile.id] = profile
+        self.bytes += size
+        self.stored += 1
+        return True
+
+    def remove(self, id: str) -> None:
+        profile = self._profiles.pop(id, None)
+        if profile is not None:
+            self.bytes -= len(profile.folded)
+
+    def get(self, id: str) -> Profile | None:
+        return self._profiles.get(id)
+
+    def summaries(self) -> list[dict]:
+        """Every stored profile, newest first."""
+        return [profile.summary() for profile in reversed(self._profiles.values())]
+
+    def clear(self) -> None:
+        self._profiles.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "profiles": len(self._profiles),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "rejected": self.rejected,
+        }
+
+
+class SamplingProfiler:
+    """Samples the stacks of the requests being profiled from its own thread."""
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        max_bytes: int,
+        sample_rate: float,
+        token: str | None,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.sample_rate = sample_rate
+        self.token = token
+        self.store = ProfileStore(max_bytes)
+        self._active: dict[asyncio.Task, Profile] = {}
+        # Held while sampling, so a profile is never read while it is updated
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._work, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._stopped.set()
+        self._wake.set()
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    def authorized(self, token: str | None) -> bool:
+        if not self.token or not token:
+            return False
+        return secrets.compare_digest(token.encode(), self.token.encode())
+
+    def wants(self, scope: Scope) -> bool:
+        """Whether to profile a request: it has the token, or it is sampled."""
+        for name, value in scope["headers"]:
+            if name == TOKEN_HEADER and self.authorized(value.decode("latin-1")):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def begin(self, id: str, method: str, path: str) -> Profile:
+        """Start sampling the current task, until ``end`` is called with it."""
+        task = asyncio.current_task()
+        profile = Profile(id, method, path, task)
+        with self._lock:
+            self._active[task] = profile
+        self._wake.set()
+        return profile
+
+    def end(self, profile: Profile, status: int) -> None:
+        with self._lock:
+            self._active.pop(profile.task, None)
+        profile.task = None
+        profile.status = status
+        profile.duration = time.time() - profile.started_at
+        profile.folded = "".join(
+            f"{stack} {count}\n" for stack, count in sorted(profile.samples.items())
+        ).encode()
+        profile.samples.clear()
+        if not self.store.add(profile):
+            logger.warning(
+                "Dropped a %s byte profile, larger than the store",
+                len(profile.folded),
+            )
+
+    def sample(self) -> None:
+        """Add the current stack of every request being profiled to its profile."""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        current = asyncio.current_task(self._loop)
+        with self._lock:
+            for task, profile in self._active.items():
+                coroutine = task.get_coro()
+                if task is current and frame is not None:
+                    stack = running_stack(frame, getattr(coroutine, "cr_code", None))
+                    profile.running_samples += 1
+                else:
+                    stack = awaiting_stack(coroutine)
+                if stack:
+                    profile.samples[";".join(stack)] += 1
+                    profile.sample_count += 1
+
+    def _work(self) -> None:
+        while not self._stopped.is_set():
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            if self._stopped.wait(self.interval_seconds):
+                return
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Sampling request stacks failed")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "active": len(self._active),
+            "sample_rate": self.sample_rate,
+            **self.store.stats(),
+        }
+
+
+class ProfilerMiddleware:
+    """Profiles the requests ``profiler`` wants, under their correlation id.
+
+    Goes inside CorrelationIdMiddleware, which sets the id and returns it in
+    the X-Request-ID response header. Paths under ``excluded_prefix`` are never
+    profiled, so reading profiles does not add more of them.
+    """
+
+    def __init__(self, app: ASGIApp, excluded_prefix: str | None = None) -> None:
+        self.app = app
+        self.excluded_prefix = excluded_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not profiler.running
+            or (
+                self.excluded_prefix is not None
+                and scope["path"].startswith(self.excluded_prefix)
+            )
+            or not correlation_id.get()
+            or not profiler.wants(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profile = profiler.begin(correlation_id.get(), scope["method"], scope["path"])
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            profiler.end(profile, status)
+
+
+profiler = SamplingProfiler(
+    interval_seconds=config.PROFILER_INTERVAL_SECONDS,
+    max_bytes=config.PROFILER_MAX_BYTES,
+    sample_rate=config.PROFILER_SAMPLE_RATE,
+    token=config.PROFILER_TOKEN,
+)
@@ -0,0 +1,71 @@
+"""A pool of long-lived, read-only SQLite connections for ``databases``.
+
+The stock SQLite backend opens (and closes) a new connection, with its own
+thread, for every query. Under WAL, readers never block the writer or each
+other, so reads are spread over a fixed set of connections kept open instead.
+"""
+
+import asyncio
+from typing import ClassVar
+
+import aiosqlite
+import databases
+from databases.backends.sqlite import SQLiteBackend
+from databases.core import DatabaseURL
+
+
+class SQLiteReadPool:
+    def __init__(self, url: DatabaseURL, size: int, **options) -> None:
+        self._database = url.database
+        self._size = size
+        self._options = options
+        self._connections: list[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] | None = None
+
+    async def open(self) -> None:
+        self._idle = asyncio.Queue()
+        for _ in range(self._size):
+            connection = await aiosqlite.connect(
+                database=self._database, isolation_level=None, **self._options
+            )
+            await connection.execute("PRAGMA query_only=ON")
+            self._connections.append(connection)
+            self._idle.put_nowait(connection)
+
+    async def close(self) -> None:
+        for connection in self._connections:
+            await connection.close()
+        self._connections = []
+        self._idle = None
+
+    async def acquire(self) -> aiosqlite.Connection:
+        return await self._idle.get()
+
+    async def release(self, connection: aiosqlite.Connection) -> None:
+        self._idle.put_nowait(connection)
+
+    def stats(self) -> dict:
+        idle = self._idle.qsize() if self._idle else 0
+        return {"size": len(self._connections), "in_use": len(self._connections) - idle}
+
+
+class SQLiteReadBackend(SQLiteBackend):
+    def __init__(self, database_url: DatabaseURL | str, pool_size: int = 4, **options):
+        super().__init__(database_url, **options)
+        self._pool = SQLiteReadPool(self._database_url, pool_size, **options)
+
+    async def connect(self) -> None:
+        await self._pool.open()
+
+    async def disconnect(self) -> None:
+        await self._pool.close()
+
+
+class SQLiteReadDatabase(databases.Database):
+    SUPPORTED_BACKENDS: ClassVar[dict[str, str]] = {
+        **databases.Database.SUPPORTED_BACKENDS,
+        "sqlite": "social_media.read_pool:SQLiteReadBackend",
+    }
+
+    def stats(self) -> dict:
+        return self._backend._pool.stats()
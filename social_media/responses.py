@@ -0,0 +1,42 @@
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON rendered by orjson; ``content`` must already be plain dicts and lists."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+class RecordSerializer:
+    """Turns database records into plain dicts shaped like ``model``.
+
+    Every record of a query has the same columns, so only the first one is
+    validated against the schema; the rest are converted without pydantic, by
+    zipping the column names over each record's values.
+    """
+
+    def __init__(self, model: type[BaseModel]) -> None:
+        self.model = model
+        self.checked = False
+
+    def __call__(self, records: list) -> list[dict]:
+        if not records:
+            return []
+        # Column names can be quoted_name, a str subclass orjson refuses
+        keys = tuple(str(key) for key in records[0])
+        rows = [dict(zip(keys, record.values())) for record in records]
+        if not self.checked:
+            self.check(rows[0])
+        return rows
+
+    def check(self, row: dict) -> None:
+        self.model.model_validate(row)
+        if row.keys() != self.model.model_fields.keys():
+            raise ValueError(
+                f"Columns {sorted(row)} do not match {self.model.__name__} fields "
+                f"{sorted(self.model.model_fields)}"
+            )
+        self.checked = True
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from social_media.broadcast import BroadcastHub, Subscriber, broadcast_hub
+from social_media.config import config
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+async def stream_events(hub: BroadcastHub, subscriber: Subscriber):
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscriber.queue.get(), config.BROADCAST_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                # A comment line, so proxies do not close an idle stream
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                return
+            yield event.message
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+@router.get("")
+async def get_events(last_event_id: Annotated[int | None, Header()] = None):
+    """Server-sent events for new posts and comments, and changed like counts.
+
+    Browsers reconnect with the Last-Event-ID header on their own; the events
+    missed in between are sent first, or a ``reset`` event if they are gone.
+    """
+    logger.info("Subscribing to events")
+    subscriber = broadcast_hub.subscribe(last_event_id)
+    if subscriber is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many subscribers, please retry later",
+            headers={"Retry-After": "5"},
+        )
+    return StreamingResponse(
+        stream_events(broadcast_hub, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
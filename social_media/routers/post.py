@@ -1,40 +1,126 @@
 import logging
+import sqlite3
 from enum import Enum
 from typing import Annotated
 
 import sqlalchemy
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
 
-from social_media.database import comment_table, database, like_table, post_table
+from social_media import sql
+from social_media.broadcast import broadcast_hub
+from social_media.cache import SingleFlight, TTLCache
+from social_media.config import config
+from social_media.database import (
+    comment_table,
+    database,
+    like_table,
+    post_table,
+    post_trending_table,
+    trending_state_table,
+)
+from social_media.etag import etag_matches, make_etag, not_modified
+from social_media.like_buffer import like_buffer
 from social_media.models.post import (
+    BulkCreated,
     Comment,
     CommentIn,
+    CommentPage,
     PostLike,
     PostLikeIn,
     UserPost,
+    UserPostBatch,
     UserPostIn,
+    UserPostPage,
     UserPostWithComments,
     UserPostWithLikes,
 )
 from social_media.models.user import User
+from social_media.pagination import (
+    decode_cursor,
+    encode_cursor,
+    invalid_cursor_exception,
+)
+from social_media.responses import ORJSONResponse, RecordSerializer
 from social_media.security import get_current_user
+from social_media.timeline import fan_out, timeline_post_ids
+from social_media.trending import trending_ranker
 
 router = APIRouter()
 
+BULK_MAX_ROWS = 500
+
 logger = logging.getLogger(__name__)
 
-select_post_and_likes = (
-    sqlalchemy.select(post_table, sqlalchemy.func.count(like_table.c.id).label("likes"))
-    .select_from(post_table.outerjoin(like_table))
-    .group_by(post_table.c.id)
+select_post_and_likes = sqlalchemy.select(
+    post_table.c.id,
+    post_table.c.body,
+    post_table.c.user_id,
+    post_table.c.like_count.label("likes"),
+)
+# Ranked by the stored trending score; the epoch comes along for the cursor
+select_trending_posts = (
+    select_post_and_likes.add_columns(
+        post_trending_table.c.score, trending_state_table.c.epoch
+    )
+    .select_from(
+        post_trending_table.join(
+            post_table, post_table.c.id == post_trending_table.c.post_id
+        ).join(trending_state_table, sqlalchemy.true())
+    )
+    .order_by(
+        sqlalchemy.desc(post_trending_table.c.score),
+        sqlalchemy.desc(post_trending_table.c.post_id),
+    )
 )
+serialize_posts = RecordSerializer(UserPostWithLikes)
+serialize_comments = RecordSerializer(Comment)
+
+
+post_exists_cache = TTLCache(
+    maxsize=config.POST_EXISTS_CACHE_MAX_SIZE,
+    ttl=config.POST_EXISTS_CACHE_TTL_SECONDS,
+)
+
+# Listing pages by (version, sorting, cursor, limit); bumping the version on
+# writes also keeps a recompute that raced with the write from being served.
+post_list_cache = TTLCache(
+    maxsize=config.POST_LIST_CACHE_MAX_SIZE, ttl=config.POST_LIST_CACHE_TTL_SECONDS
+)
+post_list_flights = SingleFlight()
+post_list_version = 0
+
 
+def invalidate_post_lists() -> None:
+    global post_list_version
+    post_list_version += 1
+    post_list_cache.clear()
 
-async def find_post(post_id: int):
-    logger.info(f"Finding post with id {post_id}")
-    query = post_table.select().where(post_table.c.id == post_id)
-    logger.debug(query)
-    return await database.fetch_one(query)
+
+async def post_exists(post_id: int) -> bool:
+    exists = post_exists_cache.get(post_id)
+    if exists is None:
+        logger.info("Checking post with id %s exists", post_id)
+        query = sqlalchemy.select(post_table.c.id).where(post_table.c.id == post_id)
+        exists = await sql.fetch_val(query, read_only=True) is not None
+        # A miss may be a post just created by another worker, recheck soon
+        ttl = None if exists else config.POST_MISSING_CACHE_TTL_SECONDS
+        post_exists_cache.set(post_id, exists, ttl=ttl)
+    return exists
+
+
+async def like_stored(post_id: int, user_id: int) -> bool:
+    query = sqlalchemy.select(like_table.c.id).where(
+        like_table.c.post_id == post_id, like_table.c.user_id == user_id
+    )
+    return await sql.fetch_val(query, read_only=True) is not None
 
 
 @router.post("/post", response_model=UserPost, status_code=201)
@@ -44,34 +130,264 @@ async def create_post(
     logger.info("Creating post")
     data = {**post.model_dump(), "user_id": current_user.id}
     query = post_table.insert().values(data)
-    last_record_id = await database.execute(query)
+    async with database.transaction():
+        last_record_id = await sql.execute(query)
+        await fan_out(current_user.id, [last_record_id])
+    post_exists_cache.set(last_record_id, True)
+    invalidate_post_lists()
+    broadcast_hub.publish("post", {**data, "id": last_record_id, "likes": 0})
     return {**data, "id": last_record_id}
 
 
+def json_response(content, response: Response, headers: dict | None = None):
+    """Render ``content`` with orjson when FAST_JSON_ENABLED is set.
+
+    Returning a response skips FastAPI's ``response_model`` validation, so
+    ``content`` must already be plain data matching the model, e.g. rows from a
+    ``RecordSerializer``. Otherwise ``content`` is returned for FastAPI to
+    validate and serialize as usual.
+    """
+    if config.FAST_JSON_ENABLED:
+        return ORJSONResponse(content, headers=headers)
+    if headers:
+        response.headers.update(headers)
+    return content
+
+
+def add_pending_likes(posts: list[dict]) -> None:
+    """Add likes still waiting in the write-behind buffer to the stored counts."""
+    if like_buffer.running:
+        for post in posts:
+            post["likes"] += like_buffer.pending_likes(post["id"])
+
+
 class PostSorting(str, Enum):
     new = "new"
     old = "old"
     most_likes = "most_likes"
     least_likes = "least_likes"
+    trending = "trending"
 
 
-@router.get("/post", response_model=list[UserPostWithLikes])
-async def get_all_posts(sorting: PostSorting = PostSorting.new):
+@router.get("/post", response_model=UserPostPage)
+async def get_all_posts(
+    request: Request,
+    response: Response,
+    sorting: PostSorting = PostSorting.new,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
     logger.info("Getting all posts")
-    # query = post_table.select()
+    key = (post_list_version, trending_ranker.version, sorting.value, cursor, limit)
+    cached = post_list_cache.get(key)
+    if cached is None:
+        cached = await post_list_flights.run(
+            key, lambda: fetch_posts_page(sorting, cursor, limit)
+        )
+        post_list_cache.set(key, cached)
+    page, etag = cached
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_response(page, response, headers={"ETag": etag})
+
+
+async def fetch_posts_page(
+    sorting: PostSorting, cursor: str | None, limit: int
+) -> tuple[dict, str]:
+    """A page of posts and its ETag."""
+    if sorting is PostSorting.trending:
+        return await fetch_trending_page(cursor, limit)
+    likes = post_table.c.like_count
     match sorting:
         case PostSorting.new:
             query = select_post_and_likes.order_by(sqlalchemy.desc(post_table.c.id))
         case PostSorting.old:
             query = select_post_and_likes.order_by(sqlalchemy.asc(post_table.c.id))
         case PostSorting.most_likes:
-            query = select_post_and_likes.order_by(sqlalchemy.desc("likes"))
+            query = select_post_and_likes.order_by(
+                sqlalchemy.desc(likes), sqlalchemy.desc(post_table.c.id)
+            )
         case PostSorting.least_likes:
-            query = select_post_and_likes.order_by(sqlalchemy.asc("likes"))
-        case _:
-            query = select_post_and_likes.order_by(sqlalchemy.desc("likes"))
-    logger.debug(query)
-    return await database.fetch_all(query)
+            query = select_post_and_likes.order_by(
+                sqlalchemy.asc(likes), sqlalchemy.asc(post_table.c.id)
+            )
+    if cursor:
+        # Keyset pagination: continue strictly after the last row of the previous
+        # page instead of OFFSET, ids break ties between equal like counts.
+        position = decode_cursor(cursor, sorting=str, id=int, likes=int)
+        if position["sorting"] != sorting.value:
+            raise invalid_cursor_exception()
+        match sorting:
+            case PostSorting.new:
+                query = query.where(post_table.c.id < position["id"])
+            case PostSorting.old:
+                query = query.where(post_table.c.id > position["id"])
+            case PostSorting.most_likes:
+                query = query.where(
+                    sqlalchemy.or_(
+                        likes < position["likes"],
+                        sqlalchemy.and_(
+                            likes == position["likes"],
+                            post_table.c.id < position["id"],
+                        ),
+                    )
+                )
+            case PostSorting.least_likes:
+                query = query.where(
+                    sqlalchemy.or_(
+                        likes > position["likes"],
+                        sqlalchemy.and_(
+                            likes == position["likes"],
+                            post_table.c.id > position["id"],
+                        ),
+                    )
+                )
+    # Fetch one extra row to know whether there is a next page.
+    query = query.limit(limit + 1)
+    posts = serialize_posts(await sql.fetch_all(query, read_only=True))
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(
+            sorting=sorting.value, id=posts[-1]["id"], likes=posts[-1]["likes"]
+        )
+    add_pending_likes(posts)
+    etag = make_etag([(post["id"], post["likes"]) for post in posts], next_cursor)
+    return {"posts": posts, "next_cursor": next_cursor}, etag
+
+
+async def fetch_trending_page(cursor: str | None, limit: int) -> tuple[dict, str]:
+    """A page of posts by trending score, read from the ranked table."""
+    query = select_trending_posts
+    if cursor:
+        position = decode_cursor(
+            cursor, sorting=str, id=int, score=float, epoch=float
+        )
+        if position["sorting"] != PostSorting.trending.value:
+            raise invalid_cursor_exception()
+        # Rescale a score from before the scores were rebased onto a newer
+        # epoch; within one epoch the factor is exactly 1. The epoch is a scalar
+        # subquery and the bound a row value so SQLite seeks the score index.
+        epoch = sqlalchemy.select(trending_state_table.c.epoch).scalar_subquery()
+        score = sqlalchemy.literal(position["score"]) * sqlalchemy.func.pow(
+            2.0, (position["epoch"] - epoch) / trending_ranker.half_life_seconds
+        )
+        ranked = sqlalchemy.tuple_(
+            post_trending_table.c.score, post_trending_table.c.post_id
+        )
+        query = query.where(ranked < sqlalchemy.tuple_(score, position["id"]))
+    records = await sql.fetch_all(query.limit(limit + 1), read_only=True)
+    posts = [
+        {
+            "id": record.id,
+            "body": record.body,
+            "user_id": record.user_id,
+            "likes": record.likes,
+        }
+        for record in records[:limit]
+    ]
+    next_cursor = None
+    if len(records) > limit:
+        last = records[limit - 1]
+        next_cursor = encode_cursor(
+            sorting=PostSorting.trending.value,
+            id=last.id,
+            score=last.score,
+            epoch=last.epoch,
+        )
+    add_pending_likes(posts)
+    etag = make_etag([(post["id"], post["likes"]) for post in posts], next_cursor)
+    return {"posts": posts, "next_cursor": next_cursor}, etag
+
+
+@router.get("/timeline", response_model=UserPostPage)
+async def get_home_timeline(
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_user)],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
+    """Posts of the current user and of the users they follow, newest first."""
+    logger.info("Getting home timeline")
+    before_id = decode_cursor(cursor, id=int)["id"] if cursor else None
+    # Fetch one extra id to know whether there is a next page.
+    post_ids = await timeline_post_ids(current_user.id, before_id, limit + 1)
+    next_cursor = None
+    if len(post_ids) > limit:
+        post_ids = post_ids[:limit]
+        next_cursor = encode_cursor(id=post_ids[-1])
+    posts = []
+    if post_ids:
+        query = select_post_and_likes.where(post_table.c.id.in_(post_ids)).order_by(
+            sqlalchemy.desc(post_table.c.id)
+        )
+        posts = serialize_posts(await sql.fetch_all(query, read_only=True))
+        add_pending_likes(posts)
+    return json_response({"posts": posts, "next_cursor": next_cursor}, response)
+
+
+@router.get("/post/batch", response_model=UserPostBatch)
+async def get_posts_batch(
+    response: Response,
+    ids: Annotated[list[int], Query(min_length=1, max_length=100)],
+    comment_counts: bool = False,
+    comments: Annotated[int, Query(ge=0, le=20)] = 0,
+):
+    """Several posts by id in request order, with one query per table.
+
+    ``comments`` is the number of oldest comments to include with each post.
+    """
+    logger.info("Getting a batch of %s posts", len(ids))
+    post_ids = list(dict.fromkeys(ids))
+    query = select_post_and_likes.where(post_table.c.id.in_(post_ids))
+    posts = serialize_posts(await sql.fetch_all(query, read_only=True))
+    add_pending_likes(posts)
+    found = {
+        post["id"]: {**post, "comment_count": None, "comments": None} for post in posts
+    }
+
+    if comment_counts and found:
+        query = (
+            sqlalchemy.select(
+                comment_table.c.post_id, sqlalchemy.func.count().label("comment_count")
+            )
+            .where(comment_table.c.post_id.in_(list(found)))
+            .group_by(comment_table.c.post_id)
+        )
+        rows = await sql.fetch_all(query, read_only=True)
+        counts = {row.post_id: row.comment_count for row in rows}
+        for post_id, post in found.items():
+            post["comment_count"] = counts.get(post_id, 0)
+
+    if comments and found:
+        position = (
+            sqlalchemy.func.row_number()
+            .over(partition_by=comment_table.c.post_id, order_by=comment_table.c.id)
+            .label("position")
+        )
+        ranked = (
+            sqlalchemy.select(comment_table, position)
+            .where(comment_table.c.post_id.in_(list(found)))
+            .subquery()
+        )
+        query = (
+            sqlalchemy.select(
+                ranked.c.id, ranked.c.body, ranked.c.post_id, ranked.c.user_id
+            )
+            .where(ranked.c.position <= comments)
+            .order_by(ranked.c.post_id, ranked.c.id)
+        )
+        for post in found.values():
+            post["comments"] = []
+        rows = serialize_comments(await sql.fetch_all(query, read_only=True))
+        for comment in rows:
+            found[comment["post_id"]]["comments"].append(comment)
+
+    batch = {
+        "posts": [found[post_id] for post_id in post_ids if post_id in found],
+        "missing": [post_id for post_id in post_ids if post_id not in found],
+    }
+    return json_response(batch, response)
 
 
 @router.post("/comment", response_model=Comment, status_code=201)
@@ -79,61 +395,236 @@ async def create_comment(
     comment: CommentIn, current_user: Annotated[User, Depends(get_current_user)]
 ):
     logger.info("Creating comment")
-    post = await find_post(post_id=comment.post_id)
-    if not post:
+    if not await post_exists(comment.post_id):
         raise HTTPException(
             status_code=404, detail=f"Post with id {comment.post_id} not found!"
         )
     data = {**comment.model_dump(), "user_id": current_user.id}
     query = comment_table.insert().values(data)
-    logger.debug(query)
-    last_record_id = await database.execute(query)
+    last_record_id = await sql.execute(query)
+    broadcast_hub.publish("comment", {**data, "id": last_record_id})
     return {**data, "id": last_record_id}
 
 
-@router.get("/post/{post_id}/comment", response_model=list[Comment])
-async def get_comments_on_post(post_id: int):
-    logger.info("Getting comments on post")
+def select_comments_page(post_id: int, limit: int, after_id: int | None = None):
+    """Comments on a post, oldest first, with one extra row to detect a next page."""
     query = comment_table.select().where(comment_table.c.post_id == post_id)
-    logger.debug(query)
-    return await database.fetch_all(query)
+    if after_id is not None:
+        query = query.where(comment_table.c.id > after_id)
+    return query.order_by(comment_table.c.id).limit(limit + 1)
+
+
+def paginate_comments(comments: list, limit: int) -> dict:
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_cursor = encode_cursor(id=comments[-1]["id"])
+    return {"comments": comments, "next_cursor": next_cursor}
+
+
+@router.get("/post/{post_id}/comment", response_model=CommentPage)
+async def get_comments_on_post(
+    response: Response,
+    post_id: int,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
+    logger.info("Getting comments on post")
+    after_id = decode_cursor(cursor, id=int)["id"] if cursor else None
+    query = select_comments_page(post_id, limit, after_id)
+    comments = serialize_comments(await sql.fetch_all(query, read_only=True))
+    return json_response(paginate_comments(comments, limit), response)
 
 
 @router.get("/post/{post_id}", response_model=UserPostWithComments)
-async def get_post_with_comments(post_id: int):
-    logger.info("Getting post and its all comments")
-    # post = await find_post(post_id=post_id)
-    query = select_post_and_likes.where(post_table.c.id == post_id)
-    logger.debug(query)
-    post = await database.fetch_one(query)
-    if not post:
+async def get_post_with_comments(
+    request: Request,
+    response: Response,
+    post_id: int,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
+    logger.info("Getting post and its first page of comments")
+    # One round-trip: the post LEFT JOINed to its first page of comments, so a
+    # post without comments still comes back as a single row of NULL comments.
+    comments = select_comments_page(post_id, limit).subquery()
+    query = (
+        select_post_and_likes.add_columns(
+            comments.c.id.label("comment_id"),
+            comments.c.body.label("comment_body"),
+            comments.c.user_id.label("comment_user_id"),
+        )
+        .select_from(
+            post_table.outerjoin(comments, comments.c.post_id == post_table.c.id)
+        )
+        .where(post_table.c.id == post_id)
+        .order_by(comments.c.id)
+    )
+    rows = await sql.fetch_all(query, read_only=True)
+    if not rows:
         raise HTTPException(
             status_code=404, detail=f"Post with id {post_id} not found!"
         )
-    """
-    class UserPostWithComments(BaseModel):
-    post: UserPost
-    comments: list[Comment]
-
-    """
-    comments = await get_comments_on_post(post_id=post_id)
-    return {"post": post, "comments": comments}
+    post = {
+        "id": rows[0].id,
+        "body": rows[0].body,
+        "user_id": rows[0].user_id,
+        "likes": rows[0].likes,
+    }
+    add_pending_likes([post])
+    comments = [
+        {
+            "id": row.comment_id,
+            "body": row.comment_body,
+            "post_id": post_id,
+            "user_id": row.comment_user_id,
+        }
+        for row in rows
+        if row.comment_id is not None
+    ]
+    page = paginate_comments(comments, limit)
+    etag = make_etag(
+        post["id"],
+        post["likes"],
+        [comment["id"] for comment in page["comments"]],
+        page["next_cursor"],
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_response({"post": post, **page}, response, headers={"ETag": etag})
 
 
 @router.post("/like", response_model=PostLike, status_code=201)
 async def like_post(
-    like: PostLikeIn, current_user: Annotated[User, Depends(get_current_user)]
+    like: PostLikeIn,
+    current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
 ):
     logger.info("Liking post")
-
-    post = await find_post(like.post_id)
-    if not post:
+    if not await post_exists(like.post_id):
         raise HTTPException(status_code=404, detail="Post not found!")
     data = {**like.model_dump(), "user_id": current_user.id}
 
-    query = like_table.insert().values(data)
+    if like_buffer.running:
+        # The buffer only knows the likes it has not flushed yet
+        if await like_stored(like.post_id, current_user.id) or not like_buffer.add(
+            like.post_id, current_user.id
+        ):
+            raise HTTPException(status_code=409, detail="Post already liked!")
+        invalidate_post_lists()
+        response.status_code = 202
+        return {**data, "id": None}
 
-    logger.debug(query)
+    query = like_table.insert().values(data)
+    count_query = (
+        post_table.update()
+        .where(post_table.c.id == like.post_id)
+        .values(like_count=post_table.c.like_count + 1)
+        .returning(post_table.c.like_count)
+    )
 
-    last_record_id = await database.execute(query)
+    # The transaction starts with its write, so a concurrent like waits for
+    # the write lock instead of failing to upgrade a read; the unique index on
+    # likes (post_id, user_id) rejects a duplicate.
+    try:
+        async with database.transaction():
+            last_record_id = await sql.execute(query)
+            likes = await sql.fetch_val(count_query)
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=409, detail="Post already liked!") from None
+    invalidate_post_lists()
+    broadcast_hub.publish_like(like.post_id, likes)
     return {**data, "id": last_record_id}
+
+
+async def insert_returning_ids(table: sqlalchemy.Table, rows: list[dict]) -> list[int]:
+    """Insert ``rows`` with one multi-row INSERT and return their ids in order."""
+    query = table.insert().values(rows).returning(table.c.id)
+    # Ids are assigned in VALUES order but RETURNING order is unspecified.
+    return sorted(row.id for row in await sql.fetch_all(query))
+
+
+async def find_missing_posts(post_ids: list[int]) -> list[int]:
+    query = sqlalchemy.select(post_table.c.id).where(post_table.c.id.in_(post_ids))
+    found = {row.id for row in await sql.fetch_all(query)}
+    return [post_id for post_id in post_ids if post_id not in found]
+
+
+@router.post("/post/bulk", response_model=BulkCreated, status_code=201)
+async def create_posts_bulk(
+    posts: Annotated[list[UserPostIn], Body(min_length=1, max_length=BULK_MAX_ROWS)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    logger.info("Creating %s posts", len(posts))
+    rows = [{**post.model_dump(), "user_id": current_user.id} for post in posts]
+    async with database.transaction():
+        ids = await insert_returning_ids(post_table, rows)
+        await fan_out(current_user.id, ids)
+    for post_id in ids:
+        post_exists_cache.set(post_id, True)
+    invalidate_post_lists()
+    for post_id, row in zip(ids, rows, strict=True):
+        broadcast_hub.publish("post", {**row, "id": post_id, "likes": 0})
+    return {"ids": ids}
+
+
+@router.post("/comment/bulk", response_model=BulkCreated, status_code=201)
+async def create_comments_bulk(
+    comments: Annotated[list[CommentIn], Body(min_length=1, max_length=BULK_MAX_ROWS)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    logger.info("Creating %s comments", len(comments))
+    post_ids = list(dict.fromkeys(comment.post_id for comment in comments))
+    rows = [
+        {**comment.model_dump(), "user_id": current_user.id} for comment in comments
+    ]
+    # Posts are never deleted, so they can be looked up before the insert
+    missing = await find_missing_posts(post_ids)
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Posts with ids {missing} not found!"
+        )
+    ids = await insert_returning_ids(comment_table, rows)
+    for comment_id, row in zip(ids, rows, strict=True):
+        broadcast_hub.publish("comment", {**row, "id": comment_id})
+    return {"ids": ids}
+
+
+@router.post("/like/bulk", response_model=BulkCreated, status_code=201)
+async def like_posts_bulk(
+    likes: Annotated[list[PostLikeIn], Body(min_length=1, max_length=BULK_MAX_ROWS)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    logger.info("Liking %s posts", len(likes))
+    post_ids = [like.post_id for like in likes]
+    if len(set(post_ids)) != len(post_ids):
+        raise HTTPException(status_code=409, detail="Post liked more than once!")
+    liked_query = sqlalchemy.select(like_table.c.post_id).where(
+        like_table.c.user_id == current_user.id, like_table.c.post_id.in_(post_ids)
+    )
+    count_query = (
+        post_table.update()
+        .where(post_table.c.id.in_(post_ids))
+        .values(like_count=post_table.c.like_count + 1)
+        .returning(post_table.c.id, post_table.c.like_count)
+    )
+    rows = [{"post_id": post_id, "user_id": current_user.id} for post_id in post_ids]
+    missing = await find_missing_posts(post_ids)
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Posts with ids {missing} not found!"
+        )
+    # As in like_post, the transaction starts with its write and the unique
+    # index rejects posts already liked; only then are they looked up.
+    try:
+        async with database.transaction():
+            ids = await insert_returning_ids(like_table, rows)
+            counts = await sql.fetch_all(count_query)
+    except sqlite3.IntegrityError:
+        liked = [row.post_id for row in await sql.fetch_all(liked_query)]
+        raise HTTPException(
+            status_code=409, detail=f"Posts with ids {liked} already liked!"
+        ) from None
+    invalidate_post_lists()
+    for row in counts:
+        broadcast_hub.publish_like(row.id, row.like_count)
+    return {"ids": ids}
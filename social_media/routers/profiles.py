@@ -0,0 +1,41 @@
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import Response
+
+from social_media.profiler import profiler
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+def require_profiler_token(x_profile_token: Annotated[str | None, Header()] = None):
+    if not profiler.authorized(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiler token"
+        )
+
+
+@router.get("", dependencies=[Depends(require_profiler_token)])
+async def list_profiles():
+    """The stored profiles, newest first."""
+    logger.info("Listing profiles")
+    return {"profiles": profiler.store.summaries(), "store": profiler.store.stats()}
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profiler_token)])
+async def download_profile(profile_id: str):
+    """A profile in folded-stack format, for flamegraph.pl, inferno or speedscope."""
+    logger.info("Downloading profile")
+    profile = profiler.store.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=404, detail=f"Profile with id {profile_id} not found!"
+        )
+    return Response(
+        profile.folded,
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{profile.id}.folded"'},
+    )
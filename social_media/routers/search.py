@@ -0,0 +1,106 @@
+import logging
+from typing import Annotated
+
+import sqlalchemy
+from fastapi import APIRouter, Query, Response
+
+from social_media import sql
+from social_media.database import comment_table, comments_fts, post_table, posts_fts
+from social_media.models.post import UserPostSearchHit, UserPostSearchPage
+from social_media.pagination import (
+    decode_cursor,
+    encode_cursor,
+    invalid_cursor_exception,
+)
+from social_media.responses import RecordSerializer
+from social_media.routers.post import (
+    add_pending_likes,
+    json_response,
+    select_post_and_likes,
+)
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+serialize_hits = RecordSerializer(UserPostSearchHit)
+
+
+def match_expression(q: str) -> str:
+    """An FTS5 query matching every word of ``q``, with FTS syntax escaped."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def select_search_hits(match: str, after: dict | None = None):
+    """Matching posts with their best bm25 rank over the post and its comments.
+
+    ``after`` is the rank and id of the last post of the previous page.
+    """
+    post_hits = (
+        sqlalchemy.select(
+            posts_fts.c.rowid.label("post_id"),
+            sqlalchemy.func.bm25(sqlalchemy.literal_column("posts_fts")).label("rank"),
+        )
+        .select_from(posts_fts)
+        .where(sqlalchemy.literal_column("posts_fts").op("MATCH")(match))
+    )
+    comment_hits = (
+        sqlalchemy.select(
+            comment_table.c.post_id,
+            sqlalchemy.func.bm25(sqlalchemy.literal_column("comments_fts")),
+        )
+        .select_from(
+            comments_fts.join(comment_table, comment_table.c.id == comments_fts.c.rowid)
+        )
+        .where(sqlalchemy.literal_column("comments_fts").op("MATCH")(match))
+    )
+    hits = sqlalchemy.union_all(post_hits, comment_hits).subquery()
+    best = (
+        sqlalchemy.select(
+            hits.c.post_id, sqlalchemy.func.min(hits.c.rank).label("rank")
+        )
+        .group_by(hits.c.post_id)
+        .subquery()
+    )
+    query = (
+        select_post_and_likes.add_columns(best.c.rank)
+        .select_from(post_table.join(best, best.c.post_id == post_table.c.id))
+        .order_by(best.c.rank, post_table.c.id)
+    )
+    if after:
+        query = query.where(
+            sqlalchemy.or_(
+                best.c.rank > after["rank"],
+                sqlalchemy.and_(
+                    best.c.rank == after["rank"], post_table.c.id > after["id"]
+                ),
+            )
+        )
+    return query
+
+
+@router.get("", response_model=UserPostSearchPage)
+async def search_posts(
+    response: Response,
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
+    logger.info("Searching posts")
+    match = match_expression(q)
+    if not match:
+        return json_response({"posts": [], "next_cursor": None}, response)
+    position = None
+    if cursor:
+        position = decode_cursor(cursor, q=str, rank=float, id=int)
+        if position["q"] != q:
+            raise invalid_cursor_exception()
+    # Fetch one extra row to know whether there is a next page.
+    query = select_search_hits(match, position).limit(limit + 1)
+    posts = serialize_hits(await sql.fetch_all(query, read_only=True))
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(q=q, rank=posts[-1]["rank"], id=posts[-1]["id"])
+    add_pending_likes(posts)
+    return json_response({"posts": posts, "next_cursor": next_cursor}, response)
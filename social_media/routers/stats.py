@@ -0,0 +1,44 @@
+import logging
+
+from fastapi import APIRouter
+
+from social_media.broadcast import broadcast_hub
+from social_media.database import read_database
+from social_media.like_buffer import like_buffer
+from social_media.logging_config import logging_stats
+from social_media.profiler import profiler
+from social_media.read_pool import SQLiteReadDatabase
+from social_media.routers.post import (
+    post_exists_cache,
+    post_list_cache,
+    post_list_flights,
+)
+from social_media.security import password_hashing_pool, token_cache, user_cache
+from social_media.sql import query_stats
+from social_media.tasks import mail_dispatcher
+from social_media.trending import trending_ranker
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("")
+async def get_stats():
+    logger.info("Getting stats")
+    return {
+        "password_hashing": password_hashing_pool.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "post_exists_cache": post_exists_cache.stats(),
+        "post_list_cache": {**post_list_cache.stats(), **post_list_flights.stats()},
+        "mail": mail_dispatcher.stats(),
+        "like_buffer": like_buffer.stats(),
+        "broadcast": broadcast_hub.stats(),
+        "trending": trending_ranker.stats(),
+        "logging": logging_stats(),
+        "profiler": profiler.stats(),
+        "queries": query_stats(),
+        "read_pool": read_database.stats()
+        if isinstance(read_database, SQLiteReadDatabase)
+        else None,
+    }
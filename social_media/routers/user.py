@@ -1,17 +1,25 @@
 import logging
+import sqlite3
+from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, Request, status
+import sqlalchemy
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 
-from social_media.database import database, user_table
-from social_media.models.user import UserIn
+from social_media import sql
+from social_media.database import database, follow_table, user_table
+from social_media.models.user import Follow, User, UserIn
 from social_media.security import (
     authenticate_user,
     create_access_token,
     create_confirmation_token,
+    get_current_user,
     get_subject_for_token_type,
     get_user,
-    hash_password,
+    hash_password_in_pool,
+    invalidate_user,
 )
+from social_media.tasks import mail_dispatcher, user_registration_email
+from social_media.timeline import add_to_timeline, remove_from_timeline
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -23,15 +31,18 @@ async def register(user: UserIn, request: Request):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_in_pool(user.password)
     query = user_table.insert().values(email=user.email, password=hashed_password)
-    logger.debug(query)
-    await database.execute(query)
+    await sql.execute(query)
+    confirmation_url = request.url_for(
+        "confirm_email", token=create_confirmation_token(user.email)
+    )
+    await mail_dispatcher.enqueue(
+        **user_registration_email(user.email, str(confirmation_url))
+    )
     return {
         "detail": "User created. Please confirm your email!",
-        "confirmation": request.url_for(
-            "confirm_email", token=create_confirmation_token(user.email)
-        ),
+        "confirmation": confirmation_url,
     }
 
 
@@ -48,6 +59,60 @@ async def confirm_email(token: str):
     query = (
         user_table.update().where(user_table.c.email == email).values(confirmed=True)
     )
-    logger.debug(query)
-    await database.execute(query)
+    await sql.execute(query)
+    invalidate_user(email)
     return {"detail": "Email confirmed successfully"}
+
+
+def follower_count_query(user_id: int, change: int):
+    return (
+        user_table.update()
+        .where(user_table.c.id == user_id)
+        .values(follower_count=user_table.c.follower_count + change)
+    )
+
+
+@router.post("/{user_id}/follow", response_model=Follow, status_code=201)
+async def follow_user(
+    user_id: int, current_user: Annotated[User, Depends(get_current_user)]
+):
+    logger.info("Following user %s", user_id)
+    if user_id == current_user.id:
+        raise HTTPException(status_code=400, detail="Users cannot follow themselves!")
+    user_query = sqlalchemy.select(user_table.c.id).where(user_table.c.id == user_id)
+    data = {"follower_id": current_user.id, "followee_id": user_id}
+
+    # Users are never deleted, so the followee is looked up before the
+    # transaction. It then starts with its write, as in like_post, and the
+    # unique index on follows rejects a user already followed.
+    if await sql.fetch_val(user_query, read_only=True) is None:
+        raise HTTPException(status_code=404, detail="User not found!")
+    try:
+        async with database.transaction():
+            await sql.execute(follow_table.insert().values(data))
+            await sql.execute(follower_count_query(user_id, 1))
+            await add_to_timeline(current_user.id, user_id)
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=409, detail="User already followed!") from None
+    return data
+
+
+@router.delete("/{user_id}/follow", status_code=204)
+async def unfollow_user(
+    user_id: int, current_user: Annotated[User, Depends(get_current_user)]
+):
+    logger.info("Unfollowing user %s", user_id)
+    query = (
+        follow_table.delete()
+        .where(
+            follow_table.c.follower_id == current_user.id,
+            follow_table.c.followee_id == user_id,
+        )
+        .returning(follow_table.c.id)
+    )
+
+    async with database.transaction():
+        if not await sql.fetch_all(query):
+            raise HTTPException(status_code=404, detail="User not followed!")
+        await sql.execute(follower_count_query(user_id, -1))
+        await remove_from_timeline(current_user.id, user_id)
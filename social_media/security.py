@@ -1,5 +1,6 @@
 import datetime
 import logging
+import time
 
 # import secrets
 from typing import Annotated, Literal
@@ -9,7 +10,12 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import ExpiredSignatureError, JWTError, jwt
 from passlib.context import CryptContext
 
-from social_media.database import database, user_table
+from social_media import sql
+from social_media.cache import TTLCache
+from social_media.config import config
+from social_media.database import user_table
+from social_media.executor import BoundedExecutor
+from social_media.metrics import measured, password_hash_duration
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +27,21 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 pwd_context = CryptContext(schemes=["bcrypt"])
 
+# bcrypt is deliberately slow, keep it off the event loop
+password_hashing_pool = BoundedExecutor(
+    name="password-hashing",
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    max_pending=config.PASSWORD_HASH_MAX_PENDING,
+)
+
+# Authenticated users by email, and decoded access tokens by token
+user_cache = TTLCache(
+    maxsize=config.USER_CACHE_MAX_SIZE, ttl=config.USER_CACHE_TTL_SECONDS
+)
+token_cache = TTLCache(
+    maxsize=config.USER_CACHE_MAX_SIZE, ttl=config.USER_CACHE_TTL_SECONDS
+)
+
 
 def create_credentials_exception(detail: str) -> HTTPException:
     return HTTPException(
@@ -38,9 +59,7 @@ def confirm_token_expire_minutes() -> int:
     return 1440
 
 
-def get_subject_for_token_type(
-    token: str, _type: Literal["access", "confirmation"]
-) -> str:
+def decode_token(token: str, _type: Literal["access", "confirmation"]) -> dict:
     try:
         payload = jwt.decode(token, SECRURITY_KEY, algorithms=[ALGORITHM])
 
@@ -54,7 +73,13 @@ def get_subject_for_token_type(
     toeken_type = payload.get("type")
     if _type != toeken_type or _type is None:
         raise create_credentials_exception(f"Invalid token type, expeted '{_type}'")
-    return email
+    return payload
+
+
+def get_subject_for_token_type(
+    token: str, _type: Literal["access", "confirmation"]
+) -> str:
+    return decode_token(token, _type)["sub"]
 
 
 def create_access_token(email: str) -> str:
@@ -86,10 +111,26 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_in_pool(password: str) -> str:
+    hashed, elapsed = await password_hashing_pool.run(
+        measured, hash_password, password
+    )
+    password_hash_duration.observe(elapsed, "hash")
+    return hashed
+
+
+async def verify_password_in_pool(plain_password: str, hashed_password: str) -> bool:
+    verified, elapsed = await password_hashing_pool.run(
+        measured, verify_password, plain_password, hashed_password
+    )
+    password_hash_duration.observe(elapsed, "verify")
+    return verified
+
+
 async def get_user(email: str):
-    logger.debug("Feching user from database", extra={"emai": email})
+    logger.debug("Feching user from database", extra={"email": email})
     query = user_table.select().where(user_table.c.email == email)
-    result = await database.fetch_one(query)
+    result = await sql.fetch_one(query, read_only=True)
     return result if result else None
 
 
@@ -98,7 +139,7 @@ async def authenticate_user(email: str, password: str) -> str:
     user = await get_user(email)
     if not user:
         raise create_credentials_exception("Invalid email or password!")
-    if not verify_password(password, user.password):
+    if not await verify_password_in_pool(password, user.password):
         raise create_credentials_exception("Invalid email or password!")
     if not user.confirmed:
         raise create_credentials_exception("User not confirmed!")
@@ -107,8 +148,21 @@ async def authenticate_user(email: str, password: str) -> str:
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     # logger.debug("Getting current user", extra={"token": token})
-    email = get_subject_for_token_type(token, "access")
-    user = await get_user(email=email)
+    email = token_cache.get(token)
+    if email is None:
+        payload = decode_token(token, "access")
+        email = payload["sub"]
+        # Never serve a token from cache past its own expiry
+        token_cache.set(token, email, ttl=payload["exp"] - time.time())
+    user = user_cache.get(email)
     if user is None:
-        raise create_credentials_exception("Could not find user for this token!")
+        user = await get_user(email=email)
+        if user is None:
+            raise create_credentials_exception("Could not find user for this token!")
+        user_cache.set(email, user)
     return user
+
+
+def invalidate_user(email: str) -> None:
+    """Drop a cached user, call after every change to its row."""
+    user_cache.invalidate(email)
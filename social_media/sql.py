@@ -0,0 +1,113 @@
+"""Timed, logged wrappers around the ``database`` query methods.
+
+Timings are kept per statement name: its kind and the tables it touches, such
+as ``SELECT posts, likes``, which has a bounded number of values whatever the
+bound values or row counts. The full SQL text is only compiled when DEBUG
+logging is on.
+"""
+
+import logging
+import time
+
+import sqlalchemy
+from sqlalchemy.sql import ClauseElement
+
+from social_media.database import database, read_database
+from social_media.metrics import query_duration
+
+logger = logging.getLogger(__name__)
+
+# Statement names beyond this many are timed together as "other"
+MAX_QUERY_NAMES = 256
+
+query_timings: dict[str, dict] = {}
+
+
+def table_names(from_clause) -> list[str]:
+    if isinstance(from_clause, sqlalchemy.Join):
+        return table_names(from_clause.left) + table_names(from_clause.right)
+    if isinstance(from_clause, sqlalchemy.TableClause):
+        return [from_clause.name]
+    return ["subquery"]
+
+
+def statement_name(statement: ClauseElement | str) -> str:
+    """The kind of a statement and the tables it reads or writes."""
+    if isinstance(statement, sqlalchemy.Select):
+        tables = [
+            name
+            for from_clause in statement.get_final_froms()
+            for name in table_names(from_clause)
+        ]
+        return " ".join(["SELECT", ", ".join(dict.fromkeys(tables))]).rstrip()
+    if isinstance(statement, sqlalchemy.CompoundSelect):
+        return "SELECT compound"
+    if isinstance(statement, sqlalchemy.Insert):
+        return f"INSERT {statement.table.name}"
+    if isinstance(statement, sqlalchemy.Update):
+        return f"UPDATE {statement.table.name}"
+    if isinstance(statement, sqlalchemy.Delete):
+        return f"DELETE {statement.table.name}"
+    text = statement if isinstance(statement, str) else str(statement)
+    return text.split(None, 1)[0].upper() if text.strip() else "other"
+
+
+def record_timing(name: str, elapsed: float) -> None:
+    timing = query_timings.get(name)
+    if timing is None:
+        if len(query_timings) >= MAX_QUERY_NAMES:
+            name = "other"
+            timing = query_timings.get(name)
+        if timing is None:
+            timing = query_timings[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+    elapsed_ms = elapsed * 1000
+    timing["count"] += 1
+    timing["total_ms"] += elapsed_ms
+    timing["max_ms"] = max(timing["max_ms"], elapsed_ms)
+    query_duration.observe(elapsed, name)
+
+
+def query_stats(limit: int = 20) -> dict:
+    """The ``limit`` statement names with the most total time spent."""
+    slowest = sorted(
+        query_timings.items(), key=lambda item: item[1]["total_ms"], reverse=True
+    )
+    return dict(slowest[:limit])
+
+
+async def timed(method, query, *args):
+    start = time.perf_counter()
+    try:
+        return await method(query, *args)
+    finally:
+        elapsed = time.perf_counter() - start
+        record_timing(statement_name(query), elapsed)
+        # Only compiled to SQL text if a DEBUG record is actually emitted
+        logger.debug("%.2f ms: %s", elapsed * 1000, query)
+
+
+# read_only=True sends the query to read_database: use it only outside of
+# transactions and where a replica lagging behind the writer is acceptable.
+
+
+async def fetch_all(query, values: dict | None = None, read_only: bool = False):
+    db = read_database if read_only else database
+    return await timed(db.fetch_all, query, values)
+
+
+async def fetch_one(query, values: dict | None = None, read_only: bool = False):
+    db = read_database if read_only else database
+    return await timed(db.fetch_one, query, values)
+
+
+async def fetch_val(query, values: dict | None = None, read_only: bool = False):
+    db = read_database if read_only else database
+    return await timed(db.fetch_val, query, values)
+
+
+async def execute(query, values: dict | None = None):
+    return await timed(database.execute, query, values)
+
+
+async def execute_many(query, values: list[dict]):
+    return await timed(database.execute_many, query, values)
@@ -0,0 +1,29 @@
+import sqlite3
+
+
+def sqlite_pragmas(config) -> list[str]:
+    """PRAGMA statements for the SQLite tuning profile in ``config``."""
+    return [
+        f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size={int(config.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA temp_store={config.SQLITE_TEMP_STORE}",
+    ]
+
+
+def tuned_connection_factory(pragmas: list[str]) -> type[sqlite3.Connection]:
+    """A ``sqlite3.connect(factory=...)`` class that runs ``pragmas`` on open.
+
+    Both ``sqlite3`` users (the SQLAlchemy engine and aiosqlite behind
+    ``databases``) accept ``factory``, so every connection gets the profile.
+    """
+
+    class TunedConnection(sqlite3.Connection):
+        def __init__(self, *args, **kwargs) -> None:
+            super().__init__(*args, **kwargs)
+            for pragma in pragmas:
+                self.execute(pragma).close()
+
+    return TunedConnection
@@ -1,18 +1,61 @@
+import asyncio
 import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import httpx
+
 from social_media.config import config
+from social_media.metrics import mailgun_duration
 
 logger = logging.getLogger(__name__)
 
+# Shared, pooled client; opened and closed by the app lifespan
+http_client: httpx.AsyncClient | None = None
+
 
 class APIResponseError(Exception):
     pass
 
 
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=config.HTTP_CLIENT_TIMEOUT_SECONDS,
+        limits=httpx.Limits(max_connections=config.HTTP_CLIENT_MAX_CONNECTIONS),
+    )
+
+
+def open_http_client() -> httpx.AsyncClient:
+    global http_client
+    if http_client is None:
+        http_client = create_http_client()
+    return http_client
+
+
+async def close_http_client() -> None:
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+
+@asynccontextmanager
+async def http_client_session() -> AsyncIterator[httpx.AsyncClient]:
+    """The shared client, or outside the app lifespan a client closed after use."""
+    if http_client is not None:
+        yield http_client
+        return
+    async with create_http_client() as client:
+        yield client
+
+
 async def send_simple_mail(to: str, subject: str, body: str):
     logger.debug(f"Sending email to '{to[:3]}' with subject '{subject[:20]}'")
-    async with httpx.AsyncClient() as client:
-        end_point = f"https://api.mailgun.net/v3/{config.MAILGUN_DOMAIN}/messages"
+    end_point = f"{config.MAILGUN_BASE_URL}/{config.MAILGUN_DOMAIN}/messages"
+    async with http_client_session() as client:
+        start = time.perf_counter()
+        status = "error"
         try:
             response = await client.post(
                 end_point,
@@ -24,25 +67,140 @@ async def send_simple_mail(to: str, subject: str, body: str):
                     "text": body,
                 },
             )
+            status = response.status_code
             response.raise_for_status()
 
             logger.debug(response.content)
 
             return response
         except httpx.HTTPStatusError as err:
-
             raise APIResponseError(
                 f"API request to Mailgun failed with status code {err.response.status_code} and message {err.response.text}"
             ) from err
+        finally:
+            mailgun_duration.observe(time.perf_counter() - start, status)
 
 
-async def send_user_registration_email(email: str, confirmation_url: str):
-    return await send_simple_mail(
-        to=email,
-        subject="Successfully signed up!",
-        body=(
+def user_registration_email(email: str, confirmation_url: str) -> dict:
+    return {
+        "to": email,
+        "subject": "Successfully signed up!",
+        "body": (
             f"hi {email}! You have successfully signed up to Noel Yang's social media."
             "Please click the link below to confirm your email address:"
             f"{confirmation_url}\n\nThanks"
         ),
-    )
+    }
+
+
+async def send_user_registration_email(email: str, confirmation_url: str):
+    return await send_simple_mail(**user_registration_email(email, confirmation_url))
+
+
+class MailDispatcher:
+    """Sends queued emails from background workers so requests never wait on Mailgun.
+
+    Failed sends are retried with exponential backoff; ``stop`` drains the queue.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        max_retries: int,
+        retry_backoff_seconds: float,
+    ) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"mail-dispatcher-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float | None = None) -> None:
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Mail queue not drained, dropping {self._queue.qsize()} emails"
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, to: str, subject: str, body: str) -> None:
+        """Queue an email, waiting for room when the queue is full.
+
+        Outside the app lifespan, with no workers to send it, the email is sent
+        right away instead.
+        """
+        message = {"to": to, "subject": subject, "body": body}
+        if not self.running:
+            logger.warning("Mail dispatcher is not running, sending email inline")
+            await self._deliver(message)
+            return
+        await self._queue.put(message)
+
+    async def _work(self) -> None:
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._deliver(message)
+            except Exception:
+                logger.exception("Unexpected error while sending email")
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, message: dict) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await send_simple_mail(**message)
+                self.sent += 1
+                return
+            except (APIResponseError, httpx.TransportError) as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Giving up sending email after {attempt + 1} tries")
+                    self.failed += 1
+                    return
+                delay = self.retry_backoff_seconds * 2**attempt
+                logger.warning(f"Sending email failed ({e}), retrying in {delay}s")
+                self.retried += 1
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+mail_dispatcher = MailDispatcher(
+    workers=config.MAIL_WORKERS,
+    max_queue=config.MAIL_QUEUE_SIZE,
+    max_retries=config.MAIL_MAX_RETRIES,
+    retry_backoff_seconds=config.MAIL_RETRY_BACKOFF_SECONDS,
+)
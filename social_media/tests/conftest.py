@@ -10,6 +10,10 @@ os.environ["ENV_STATE"] = "test"
 
 from social_media.database import database, user_table
 from social_media.main import app
+from social_media.routers.post import post_exists_cache, post_list_cache
+from social_media.security import token_cache, user_cache
+from social_media.sql import query_timings
+from social_media.tasks import mail_dispatcher
 
 
 @fixture(scope="session")
@@ -29,6 +33,22 @@ async def db() -> AsyncGenerator:
     await database.disconnect()
 
 
+@fixture(autouse=True)
+async def mail() -> AsyncGenerator:
+    await mail_dispatcher.start()
+    yield mail_dispatcher
+    await mail_dispatcher.stop()
+
+
+@fixture(autouse=True)
+def clear_caches() -> Generator:
+    yield
+    user_cache.clear()
+    token_cache.clear()
+    post_exists_cache.clear()
+    post_list_cache.clear()
+
+
 @fixture()
 async def async_client(client) -> AsyncGenerator:
     async with AsyncClient(
@@ -66,11 +86,96 @@ async def logged_in_token(async_client: AsyncClient, confirmed_user: dict):
     return response.json()["access_token"]
 
 
+@fixture()
+async def other_logged_in_token(async_client: AsyncClient) -> str:
+    user_details = {"email": "other@example.com", "password": "1234"}
+    await async_client.post("/users/register", json=user_details)
+    query = (
+        user_table.update()
+        .where(user_table.c.email == user_details["email"])
+        .values(confirmed=True)
+    )
+    await database.execute(query)
+    response = await async_client.post("users/token", json=user_details)
+    return response.json()["access_token"]
+
+
+@fixture()
+def create_post():
+    async def create_post(body: str, async_client: AsyncClient, token: str) -> dict:
+        response = await async_client.post(
+            "/posts/post",
+            json={"body": body},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        return response.json()
+
+    return create_post
+
+
+@fixture()
+def create_comment():
+    async def create_comment(
+        post_id: int, body: str, async_client: AsyncClient, token: str
+    ) -> dict:
+        response = await async_client.post(
+            "/posts/comment",
+            json={"post_id": post_id, "body": body},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        return response.json()
+
+    return create_comment
+
+
+@fixture()
+def like_post():
+    async def like_post(post_id: int, async_client: AsyncClient, token: str):
+        return await async_client.post(
+            "/posts/like",
+            json={"post_id": post_id},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    return like_post
+
+
+@fixture()
+def follow():
+    async def follow(user_id: int, async_client: AsyncClient, token: str):
+        return await async_client.post(
+            f"/users/{user_id}/follow", headers={"Authorization": f"Bearer {token}"}
+        )
+
+    return follow
+
+
+@fixture()
+async def created_post(
+    async_client: AsyncClient, logged_in_token: str, create_post
+) -> dict:
+    return await create_post("Test post", async_client, logged_in_token)
+
+
+@fixture()
+async def created_comment(
+    created_post: dict, async_client: AsyncClient, logged_in_token: str, create_comment
+) -> dict:
+    return await create_comment(
+        created_post["id"], "Test comment", async_client, logged_in_token
+    )
+
+
+@fixture(autouse=True)
+def reset_query_timings() -> Generator:
+    yield
+    query_timings.clear()
+
+
 @fixture(autouse=True)
 def mock_httpx_client(mocker):
-    mocked_client = mocker.patch("social_media.tasks.httpx.AsyncClient")
     mocked_async_client = Mock()
     response = Response(status_code=200, content="OK", request=Request("POST", "//"))
     mocked_async_client.post = AsyncMock(return_value=response)
-    mocked_client.return_value.__aenter__.return_value = mocked_async_client
+    mocker.patch("social_media.tasks.http_client", mocked_async_client)
     return mocked_async_client
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from social_media.broadcast import broadcast_hub
+
+
+@pytest.mark.anyio
+async def test_get_events_resumes_after_last_event_id(
+    async_client: AsyncClient, logged_in_token: str, mocker
+):
+    subscribe = mocker.spy(broadcast_hub, "subscribe")
+    last_event_id = broadcast_hub.last_event_id
+    await async_client.post(
+        "/posts/post",
+        json={"body": "Test post"},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    request = asyncio.create_task(
+        async_client.get("/events", headers={"Last-Event-ID": str(last_event_id)})
+    )
+    while not subscribe.spy_return_list:
+        await asyncio.sleep(0.01)
+    subscribe.spy_return.close()
+    response = await request
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert f"id: {last_event_id + 1}\nevent: post\n" in response.text
+    assert '"body":"Test post"' in response.text
+
+
+@pytest.mark.anyio
+async def test_get_events_too_many_subscribers(async_client: AsyncClient, mocker):
+    mocker.patch.object(broadcast_hub, "max_subscribers", 0)
+    response = await async_client.get("/events")
+    assert response.status_code == 503
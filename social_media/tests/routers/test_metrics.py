@@ -0,0 +1,39 @@
+import pytest
+from httpx import AsyncClient
+
+from social_media.metrics import query_duration
+
+
+@pytest.mark.anyio
+async def test_get_metrics(async_client: AsyncClient, registered_user: dict):
+    await async_client.get("/posts/post/99")
+
+    response = await async_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert (
+        'http_requests_total{method="GET",route="/posts/post/{post_id}",status="404"}'
+        in body
+    )
+    assert 'http_requests_in_flight{method="GET"} 1' in body
+    assert 'password_hash_duration_seconds_count{operation="hash"}' in body
+    assert 'db_query_duration_seconds_count{query="SELECT users"' in body
+
+
+@pytest.mark.anyio
+async def test_query_duration_one_series_per_statement_name(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    for rows in range(1, 4):
+        await async_client.post(
+            "/posts/comment/bulk",
+            json=[{"body": "Test comment", "post_id": created_post["id"]}] * rows,
+            headers={"Authorization": f"Bearer {logged_in_token}"},
+        )
+
+    # Multi-row INSERTs compile to different SQL for each row count
+    labels = [query for query, in query_duration.series]
+    assert labels.count("INSERT comments") == 1
+    assert not any("\n" in query for query in labels)
@@ -2,53 +2,10 @@ import pytest
 from httpx import AsyncClient
 
 from social_media import security
-
-
-async def create_post(
-    body: str, async_client: AsyncClient, logged_in_token: str
-) -> dict:
-    response = await async_client.post(
-        "/posts/post",
-        json={"body": body},
-        headers={"Authorization": f"Bearer {logged_in_token}"},
-    )
-    return response.json()
-
-
-async def create_comment(
-    post_id: int, body: str, async_client: AsyncClient, logged_in_token: str
-):
-    response = await async_client.post(
-        "/posts/comment",
-        json={"post_id": post_id, "body": body},
-        headers={"Authorization": f"Bearer {logged_in_token}"},
-    )
-    return response.json()
-
-
-async def like_post(
-    post_id: int, async_client: AsyncClient, logged_in_token: str
-) -> dict:
-    response = await async_client.post(
-        "/posts/like",
-        json={"post_id": post_id},
-        headers={"Authorization": f"Bearer {logged_in_token}"},
-    )
-    return response.json()
-
-
-@pytest.fixture()
-async def created_post(async_client: AsyncClient, logged_in_token: str):
-    yield await create_post("Test post", async_client, logged_in_token)
-
-
-@pytest.fixture()
-async def created_comment(
-    created_post: dict, async_client: AsyncClient, logged_in_token: str
-):
-    yield await create_comment(
-        created_post["id"], "Test comment", async_client, logged_in_token
-    )
+from social_media.config import config
+from social_media.database import database, timeline_table
+from social_media.routers.post import post_exists, post_exists_cache, post_list_cache
+from social_media.trending import trending_ranker
 
 
 @pytest.mark.anyio
@@ -99,6 +56,7 @@ async def tset_like_post(
     created_post: dict,
     logged_in_token: str,
     confirmed_user: dict,
+    like_post,
 ):
     response = await like_post(created_post["id"], async_client, logged_in_token)
     assert response.status_code == 201
@@ -112,11 +70,93 @@ async def tset_like_post(
     )
 
 
+@pytest.mark.anyio
+async def test_like_post_updates_like_count(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, like_post
+):
+    await like_post(created_post["id"], async_client, logged_in_token)
+    response = await async_client.get(f"/posts/post/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 1
+
+
+@pytest.mark.anyio
+async def test_like_post_twice(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, like_post
+):
+    await like_post(created_post["id"], async_client, logged_in_token)
+    response = await async_client.post(
+        "/posts/like",
+        json={"post_id": created_post["id"]},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 409
+    response = await async_client.get(f"/posts/post/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 1
+
+
+@pytest.mark.anyio
+async def test_like_post_not_found(async_client: AsyncClient, logged_in_token: str):
+    response = await async_client.post(
+        "/posts/like",
+        json={"post_id": 2},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 404
+
+
 @pytest.mark.anyio
 async def test_get_all_posts(async_client: AsyncClient, created_post: dict):
     response = await async_client.get("/posts/post")
     assert response.status_code == 200
-    assert response.json() == [{**created_post, "likes": 0}]
+    assert response.json() == {
+        "posts": [{**created_post, "likes": 0}],
+        "next_cursor": None,
+    }
+
+
+@pytest.mark.anyio
+async def test_get_all_posts_cached(async_client: AsyncClient, created_post: dict):
+    first = await async_client.get("/posts/post")
+    hits = post_list_cache.hits
+    second = await async_client.get("/posts/post")
+    assert post_list_cache.hits == hits + 1
+    assert second.json() == first.json()
+
+
+@pytest.mark.anyio
+async def test_get_all_posts_cache_invalidated_on_writes(
+    async_client: AsyncClient,
+    created_post: dict,
+    logged_in_token: str,
+    create_post,
+    like_post,
+):
+    await async_client.get("/posts/post")
+    await create_post("Test post 2", async_client, logged_in_token)
+    response = await async_client.get("/posts/post")
+    assert [post["id"] for post in response.json()["posts"]] == [2, 1]
+
+    await like_post(1, async_client, logged_in_token)
+    response = await async_client.get("/posts/post")
+    assert [post["likes"] for post in response.json()["posts"]] == [0, 1]
+
+
+@pytest.mark.anyio
+async def test_get_all_posts_not_modified(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, like_post
+):
+    response = await async_client.get("/posts/post")
+    etag = response.headers["etag"]
+
+    response = await async_client.get("/posts/post", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    await like_post(created_post["id"], async_client, logged_in_token)
+    response = await async_client.get("/posts/post", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
 
 
 @pytest.mark.anyio
@@ -126,6 +166,7 @@ async def test_get_all_posts_sorting(
     logged_in_token: str,
     sorting: str,
     expected_order: list,
+    create_post,
 ):
 
     await create_post("Test post 1", async_client, logged_in_token)
@@ -133,7 +174,7 @@ async def test_get_all_posts_sorting(
     response = await async_client.get("/posts/post", params=dict(sorting=sorting))
     assert response.status_code == 200
     data = response.json()
-    post_ids = [post["id"] for post in data]
+    post_ids = [post["id"] for post in data["posts"]]
     assert post_ids == expected_order
 
 
@@ -146,6 +187,8 @@ async def test_get_all_posts_sort_likes(
     logged_in_token: str,
     sorting: str,
     expected_order: list,
+    create_post,
+    like_post,
 ):
 
     await create_post("Test post 1", async_client, logged_in_token)
@@ -154,16 +197,271 @@ async def test_get_all_posts_sort_likes(
     response = await async_client.get("/posts/post", params=dict(sorting=sorting))
     assert response.status_code == 200
     data = response.json()
-    post_ids = [post["id"] for post in data]
+    post_ids = [post["id"] for post in data["posts"]]
     assert post_ids == expected_order
 
 
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "sorting, expected_order",
+    [
+        ("new", [3, 2, 1]),
+        ("old", [1, 2, 3]),
+        ("most_likes", [2, 3, 1]),
+        ("least_likes", [1, 3, 2]),
+    ],
+)
+async def test_get_all_posts_pagination(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    other_logged_in_token: str,
+    sorting: str,
+    expected_order: list,
+    create_post,
+    like_post,
+):
+    await create_post("Test post 1", async_client, logged_in_token)
+    await create_post("Test post 2", async_client, logged_in_token)
+    await create_post("Test post 3", async_client, logged_in_token)
+    await like_post(2, async_client, logged_in_token)
+    await like_post(2, async_client, other_logged_in_token)
+    await like_post(3, async_client, logged_in_token)
+
+    post_ids = []
+    params = {"sorting": sorting, "limit": 2}
+    while True:
+        response = await async_client.get("/posts/post", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["posts"]) <= 2
+        post_ids += [post["id"] for post in data["posts"]]
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+    assert post_ids == expected_order
+
+
+@pytest.mark.anyio
+async def test_get_all_posts_pagination_ties(
+    async_client: AsyncClient, logged_in_token: str, create_post
+):
+    for i in range(5):
+        await create_post(f"Test post {i}", async_client, logged_in_token)
+
+    first = await async_client.get(
+        "/posts/post", params={"sorting": "most_likes", "limit": 3}
+    )
+    second = await async_client.get(
+        "/posts/post",
+        params={
+            "sorting": "most_likes",
+            "limit": 3,
+            "cursor": first.json()["next_cursor"],
+        },
+    )
+    assert [post["id"] for post in first.json()["posts"]] == [5, 4, 3]
+    assert [post["id"] for post in second.json()["posts"]] == [2, 1]
+    assert second.json()["next_cursor"] is None
+
+
+@pytest.mark.anyio
+async def test_get_all_posts_trending(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    other_logged_in_token: str,
+    create_post,
+    like_post,
+):
+    for i in range(3):
+        await create_post(f"Test post {i}", async_client, logged_in_token)
+    await like_post(2, async_client, logged_in_token)
+    await like_post(2, async_client, other_logged_in_token)
+    await like_post(3, async_client, logged_in_token)
+
+    params = {"sorting": "trending", "limit": 1}
+    response = await async_client.get("/posts/post", params=params)
+    assert response.json() == {"posts": [], "next_cursor": None}
+
+    await trending_ranker.refresh()
+    post_ids = []
+    while True:
+        response = await async_client.get("/posts/post", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        post_ids += [post["id"] for post in data["posts"]]
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+    # Post 1 has no likes, so no trending score
+    assert post_ids == [2, 3]
+    assert data["posts"][0]["likes"] == 1
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", "WzFd"])
+async def test_get_all_posts_invalid_cursor(async_client: AsyncClient, cursor: str):
+    response = await async_client.get("/posts/post", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.anyio
+async def test_get_all_posts_cursor_for_other_sorting(
+    async_client: AsyncClient, logged_in_token: str, create_post
+):
+    await create_post("Test post 1", async_client, logged_in_token)
+    await create_post("Test post 2", async_client, logged_in_token)
+    response = await async_client.get(
+        "/posts/post", params={"sorting": "new", "limit": 1}
+    )
+    response = await async_client.get(
+        "/posts/post",
+        params={"sorting": "old", "cursor": response.json()["next_cursor"]},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_get_all_posts_limit_out_of_range(async_client: AsyncClient):
+    response = await async_client.get("/posts/post", params={"limit": 0})
+    assert response.status_code == 422
+
+
 @pytest.mark.anyio
 async def test_get_all_posts_wrong_sorting(async_client: AsyncClient):
     response = await async_client.get("/posts/post", params=dict(sorting="wrong"))
     assert response.status_code == 422
 
 
+async def get_timeline(async_client: AsyncClient, token: str, **params) -> dict:
+    response = await async_client.get(
+        "/posts/timeline",
+        params=params,
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.anyio
+async def test_get_home_timeline(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    other_logged_in_token: str,
+    create_post,
+    follow,
+):
+    await create_post("Before follow", async_client, logged_in_token)
+    await create_post("Own post", async_client, other_logged_in_token)
+    await follow(1, async_client, other_logged_in_token)
+    await create_post("After follow", async_client, logged_in_token)
+
+    post_ids = []
+    params = {"limit": 2}
+    while True:
+        data = await get_timeline(async_client, other_logged_in_token, **params)
+        post_ids += [post["id"] for post in data["posts"]]
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+    assert post_ids == [3, 2, 1]
+    # The author's own timeline does not include posts of their followers
+    data = await get_timeline(async_client, logged_in_token)
+    assert [post["id"] for post in data["posts"]] == [3, 1]
+
+
+@pytest.mark.anyio
+async def test_get_home_timeline_after_unfollow(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    other_logged_in_token: str,
+    create_post,
+    follow,
+):
+    await follow(1, async_client, other_logged_in_token)
+    await create_post("Test post", async_client, logged_in_token)
+    await async_client.delete(
+        "/users/1/follow", headers={"Authorization": f"Bearer {other_logged_in_token}"}
+    )
+    data = await get_timeline(async_client, other_logged_in_token)
+    assert data == {"posts": [], "next_cursor": None}
+
+
+@pytest.mark.anyio
+async def test_get_home_timeline_fan_out_on_read(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    other_logged_in_token: str,
+    mocker,
+    create_post,
+    follow,
+):
+    mocker.patch.object(config, "TIMELINE_FANOUT_MAX_FOLLOWERS", 0)
+    await follow(1, async_client, other_logged_in_token)
+    await create_post("Test post 1", async_client, logged_in_token)
+    await create_post("Test post 2", async_client, logged_in_token)
+
+    # Too many followers: nothing is pushed, the posts are read on request
+    assert await database.fetch_all(timeline_table.select()) == []
+    data = await get_timeline(async_client, other_logged_in_token, limit=1)
+    assert [post["id"] for post in data["posts"]] == [2]
+    data = await get_timeline(
+        async_client, other_logged_in_token, cursor=data["next_cursor"]
+    )
+    assert [post["id"] for post in data["posts"]] == [1]
+    assert data["next_cursor"] is None
+
+
+@pytest.mark.anyio
+async def test_get_posts_batch(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    other_logged_in_token: str,
+    create_post,
+    like_post,
+):
+    for i in range(3):
+        await create_post(f"Test post {i}", async_client, logged_in_token)
+    await like_post(2, async_client, logged_in_token)
+
+    response = await async_client.get(
+        "/posts/post/batch", params={"ids": [3, 99, 2, 3, 1]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [post["id"] for post in data["posts"]] == [3, 2, 1]
+    assert [post["likes"] for post in data["posts"]] == [0, 1, 0]
+    assert data["posts"][0]["comments"] is None
+    assert data["missing"] == [99]
+
+
+@pytest.mark.anyio
+async def test_get_posts_batch_with_comments(
+    async_client: AsyncClient, logged_in_token: str, create_comment, create_post
+):
+    await create_post("Test post 1", async_client, logged_in_token)
+    await create_post("Test post 2", async_client, logged_in_token)
+    for i in range(3):
+        await create_comment(1, f"Test comment {i}", async_client, logged_in_token)
+
+    response = await async_client.get(
+        "/posts/post/batch",
+        params={"ids": [1, 2], "comment_counts": True, "comments": 2},
+    )
+    posts = response.json()["posts"]
+    assert [post["comment_count"] for post in posts] == [3, 0]
+    assert [comment["id"] for comment in posts[0]["comments"]] == [1, 2]
+    assert posts[1]["comments"] == []
+
+
+@pytest.mark.anyio
+async def test_get_posts_batch_too_many_ids(async_client: AsyncClient):
+    response = await async_client.get(
+        "/posts/post/batch", params={"ids": list(range(101))}
+    )
+    assert response.status_code == 422
+
+
 @pytest.mark.anyio
 async def test_create_comment(
     async_client: AsyncClient,
@@ -189,6 +487,35 @@ async def test_create_comment(
     )
 
 
+@pytest.mark.anyio
+async def test_create_comment_post_not_found(
+    async_client: AsyncClient, logged_in_token: str
+):
+    response = await async_client.post(
+        "/posts/comment",
+        json={"post_id": 1, "body": "Test comment"},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_post_exists_cached_on_create(created_post: dict):
+    hits = post_exists_cache.hits
+    assert await post_exists(created_post["id"])
+    assert post_exists_cache.hits == hits + 1
+
+
+@pytest.mark.anyio
+async def test_post_exists_miss_replaced_on_create(
+    async_client: AsyncClient, logged_in_token: str, create_post
+):
+    assert not await post_exists(1)
+    assert post_exists_cache.get(1) is False
+    await create_post("Test post", async_client, logged_in_token)
+    assert await post_exists(1)
+
+
 @pytest.mark.anyio
 async def test_create_comment_missing_body(
     async_client: AsyncClient, created_post: dict, logged_in_token: str
@@ -207,7 +534,7 @@ async def test_get_comments_on_post(
 ):
     response = await async_client.get(f"/posts/post/{created_post['id']}/comment")
     assert response.status_code == 200
-    assert response.json() == [created_comment]
+    assert response.json() == {"comments": [created_comment], "next_cursor": None}
 
 
 @pytest.mark.anyio
@@ -216,7 +543,42 @@ async def test_get_comments_on_post_empty(
 ):
     response = await async_client.get(f"/posts/post/{created_post['id']}/comment")
     assert response.status_code == 200
-    assert response.json() == []
+    assert response.json() == {"comments": [], "next_cursor": None}
+
+
+@pytest.mark.anyio
+async def test_get_comments_on_post_pagination(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, create_comment
+):
+    for i in range(5):
+        await create_comment(
+            created_post["id"], f"Test comment {i}", async_client, logged_in_token
+        )
+
+    comment_ids = []
+    params = {"limit": 2}
+    while True:
+        response = await async_client.get(
+            f"/posts/post/{created_post['id']}/comment", params=params
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["comments"]) <= 2
+        comment_ids += [comment["id"] for comment in data["comments"]]
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+    assert comment_ids == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.anyio
+async def test_get_comments_on_post_invalid_cursor(
+    async_client: AsyncClient, created_post: dict
+):
+    response = await async_client.get(
+        f"/posts/post/{created_post['id']}/comment", params={"cursor": "e30"}
+    )
+    assert response.status_code == 400
 
 
 @pytest.mark.anyio
@@ -230,12 +592,174 @@ async def test_get_post_with_comments(
     assert response.json() == {
         "post": {**created_post, "likes": 0},
         "comments": [created_comment],
+        "next_cursor": None,
     }
 
 
+@pytest.mark.anyio
+async def test_get_post_with_comments_not_modified(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, create_comment
+):
+    url = f"/posts/post/{created_post['id']}"
+    etag = (await async_client.get(url)).headers["etag"]
+
+    response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    await create_comment(
+        created_post["id"], "Test comment", async_client, logged_in_token
+    )
+    response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["comments"]) == 1
+
+
+@pytest.mark.anyio
+async def test_get_post_with_comments_no_comments(
+    async_client: AsyncClient, created_post: dict
+):
+    response = await async_client.get(f"/posts/post/{created_post['id']}")
+    assert response.status_code == 200
+    assert response.json() == {
+        "post": {**created_post, "likes": 0},
+        "comments": [],
+        "next_cursor": None,
+    }
+
+
+@pytest.mark.anyio
+async def test_get_post_with_comments_first_page(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, create_comment
+):
+    for i in range(3):
+        await create_comment(
+            created_post["id"], f"Test comment {i}", async_client, logged_in_token
+        )
+
+    response = await async_client.get(
+        f"/posts/post/{created_post['id']}", params={"limit": 2}
+    )
+    data = response.json()
+    assert [comment["id"] for comment in data["comments"]] == [1, 2]
+
+    response = await async_client.get(
+        f"/posts/post/{created_post['id']}/comment",
+        params={"limit": 2, "cursor": data["next_cursor"]},
+    )
+    assert [comment["id"] for comment in response.json()["comments"]] == [3]
+
+
 @pytest.mark.anyio
 async def test_get_post_with_comments_empty(
     async_client: AsyncClient,
 ):
     response = await async_client.get("/posts/post/2")
     assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_create_posts_bulk(async_client: AsyncClient, logged_in_token: str):
+    response = await async_client.post(
+        "/posts/post/bulk",
+        json=[{"body": f"Test post {i}"} for i in range(3)],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 201
+    assert response.json() == {"ids": [1, 2, 3]}
+
+    response = await async_client.get("/posts/post", params={"sorting": "old"})
+    assert [post["body"] for post in response.json()["posts"]] == [
+        "Test post 0",
+        "Test post 1",
+        "Test post 2",
+    ]
+
+
+@pytest.mark.anyio
+async def test_create_posts_bulk_empty(async_client: AsyncClient, logged_in_token: str):
+    response = await async_client.post(
+        "/posts/post/bulk",
+        json=[],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_create_comments_bulk(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    response = await async_client.post(
+        "/posts/comment/bulk",
+        json=[
+            {"post_id": created_post["id"], "body": f"Comment {i}"} for i in range(2)
+        ],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 201
+    assert response.json() == {"ids": [1, 2]}
+
+
+@pytest.mark.anyio
+async def test_create_comments_bulk_post_not_found(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    response = await async_client.post(
+        "/posts/comment/bulk",
+        json=[
+            {"post_id": created_post["id"], "body": "Comment"},
+            {"post_id": 99, "body": "Comment"},
+        ],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 404
+    assert "99" in response.json()["detail"]
+
+    response = await async_client.get(f"/posts/post/{created_post['id']}/comment")
+    assert response.json()["comments"] == []
+
+
+@pytest.mark.anyio
+async def test_like_posts_bulk(
+    async_client: AsyncClient, logged_in_token: str, create_post
+):
+    for i in range(3):
+        await create_post(f"Test post {i}", async_client, logged_in_token)
+
+    response = await async_client.post(
+        "/posts/like/bulk",
+        json=[{"post_id": 3}, {"post_id": 1}],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 201
+    assert response.json() == {"ids": [1, 2]}
+
+    response = await async_client.get("/posts/post", params={"sorting": "old"})
+    assert [post["likes"] for post in response.json()["posts"]] == [1, 0, 1]
+
+
+@pytest.mark.anyio
+async def test_like_posts_bulk_already_liked(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, like_post
+):
+    await like_post(created_post["id"], async_client, logged_in_token)
+
+    response = await async_client.post(
+        "/posts/like/bulk",
+        json=[{"post_id": created_post["id"]}],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Posts with ids [1] already liked!"
+
+
+@pytest.mark.anyio
+async def test_like_posts_bulk_duplicate_post(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    response = await async_client.post(
+        "/posts/like/bulk",
+        json=[{"post_id": created_post["id"]}, {"post_id": created_post["id"]}],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == 409
@@ -0,0 +1,86 @@
+import pytest
+from httpx import AsyncClient
+
+from social_media.profiler import profiler
+
+headers = {"X-Profile-Token": "secret"}
+
+
+@pytest.fixture()
+async def running_profiler(mocker):
+    mocker.patch.object(profiler, "token", "secret")
+    await profiler.start()
+    yield profiler
+    await profiler.stop()
+    profiler.store.clear()
+
+
+@pytest.mark.anyio
+async def test_profile_request_with_token(async_client: AsyncClient, running_profiler):
+    response = await async_client.get("/posts/post", headers=headers)
+    profile_id = response.headers["X-Request-ID"]
+
+    response = await async_client.get("/profiles", headers=headers)
+
+    assert response.status_code == 200
+    (profile,) = response.json()["profiles"]
+    assert profile["id"] == profile_id
+    assert profile["method"] == "GET"
+    assert profile["path"] == "/posts/post"
+    assert profile["status"] == 200
+    assert response.json()["store"]["profiles"] == 1
+
+
+@pytest.mark.anyio
+async def test_request_without_token_not_profiled(
+    async_client: AsyncClient, running_profiler
+):
+    await async_client.get("/posts/post", headers={"X-Profile-Token": "wrong"})
+    await async_client.get("/posts/post")
+
+    assert running_profiler.store.summaries() == []
+
+
+@pytest.mark.anyio
+async def test_sampled_request_profiled(
+    async_client: AsyncClient, running_profiler, mocker
+):
+    mocker.patch.object(running_profiler, "sample_rate", 1)
+
+    await async_client.get("/posts/post")
+
+    assert len(running_profiler.store.summaries()) == 1
+
+
+@pytest.mark.anyio
+async def test_download_profile(async_client: AsyncClient, running_profiler):
+    response = await async_client.get("/posts/post", headers=headers)
+    profile_id = response.headers["X-Request-ID"]
+    running_profiler.store.get(profile_id).folded = b"main;handler 3\n"
+
+    response = await async_client.get(f"/profiles/{profile_id}", headers=headers)
+
+    assert response.status_code == 200
+    assert response.text == "main;handler 3\n"
+    assert response.headers["content-type"] == "text/plain; charset=utf-8"
+    assert (
+        response.headers["content-disposition"]
+        == f'attachment; filename="{profile_id}.folded"'
+    )
+
+
+@pytest.mark.anyio
+async def test_download_missing_profile(async_client: AsyncClient, running_profiler):
+    response = await async_client.get("/profiles/nope", headers=headers)
+
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("token", [None, "wrong"])
+async def test_profiles_need_token(async_client: AsyncClient, running_profiler, token):
+    response = await async_client.get(
+        "/profiles", headers={"X-Profile-Token": token} if token else {}
+    )
+
+    assert response.status_code == 403
@@ -0,0 +1,65 @@
+import pytest
+from httpx import AsyncClient
+
+from social_media.routers.search import match_expression
+
+
+def test_match_expression_escapes_syntax():
+    assert match_expression('say "hi" OR') == '"say" """hi""" "OR"'
+    assert match_expression("   ") == ""
+
+
+@pytest.mark.anyio
+async def test_search_posts_and_comments(
+    async_client: AsyncClient, logged_in_token: str, create_comment, create_post
+):
+    await create_post("Walking the dog", async_client, logged_in_token)
+    await create_post("Cats are great", async_client, logged_in_token)
+    await create_comment(2, "My dogs disagree", async_client, logged_in_token)
+    await create_post("Nothing to see", async_client, logged_in_token)
+
+    response = await async_client.get("/search", params={"q": "dog"})
+    assert response.status_code == 200
+    posts = response.json()["posts"]
+    assert sorted(post["id"] for post in posts) == [1, 2]
+    assert {"body", "user_id", "likes", "rank"} <= posts[0].keys()
+
+
+@pytest.mark.anyio
+async def test_search_pagination(
+    async_client: AsyncClient, logged_in_token: str, create_post
+):
+    for i in range(5):
+        await create_post(f"Search term number {i}", async_client, logged_in_token)
+
+    post_ids = []
+    params = {"q": "term", "limit": 2}
+    while True:
+        response = await async_client.get("/search", params=params)
+        data = response.json()
+        post_ids += [post["id"] for post in data["posts"]]
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+    assert sorted(post_ids) == [1, 2, 3, 4, 5]
+    assert len(post_ids) == 5
+
+
+@pytest.mark.anyio
+async def test_search_cursor_for_other_query(
+    async_client: AsyncClient, logged_in_token: str, create_post
+):
+    await create_post("Search term", async_client, logged_in_token)
+    await create_post("Search term", async_client, logged_in_token)
+    response = await async_client.get("/search", params={"q": "term", "limit": 1})
+    response = await async_client.get(
+        "/search", params={"q": "search", "cursor": response.json()["next_cursor"]}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_search_no_results(async_client: AsyncClient):
+    response = await async_client.get("/search", params={"q": '"'})
+    assert response.status_code == 200
+    assert response.json() == {"posts": [], "next_cursor": None}
@@ -2,6 +2,8 @@ from fastapi import Request, HTTPException
 import pytest
 from httpx import AsyncClient
 
+from social_media import security
+
 
 async def register_user(async_client: AsyncClient, email: str, password: str):
     response = await async_client.post(
@@ -19,6 +21,16 @@ async def test_register_user(async_client: AsyncClient):
     assert "User created. Please confirm your email!" in response.json()["detail"]
 
 
+@pytest.mark.anyio
+async def test_register_user_sends_confirmation_email(
+    async_client: AsyncClient, mail, mock_httpx_client
+):
+    await register_user(async_client, "test@example.com", "1234")
+    await mail.stop()
+    mock_httpx_client.post.assert_called_once()
+    assert mock_httpx_client.post.call_args.kwargs["data"]["to"] == ["test@example.com"]
+
+
 @pytest.mark.anyio
 async def test_register_user_already_registered(
     async_client: AsyncClient, confirmed_user: dict
@@ -30,6 +42,16 @@ async def test_register_user_already_registered(
     assert "Email already registered" in response.json()["detail"]
 
 
+@pytest.mark.anyio
+async def test_register_user_password_hashing_saturated(
+    async_client: AsyncClient, mocker
+):
+    mocker.patch("social_media.security.password_hashing_pool.max_pending", 0)
+    response = await register_user(async_client, "test@example.com", "1234")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
 @pytest.mark.anyio
 async def test_login_user_not_exists(async_client: AsyncClient):
     response = await async_client.post(
@@ -74,6 +96,15 @@ async def test_confirm_user(async_client: AsyncClient, mocker):
     assert {"detail": "Email confirmed successfully"}.items() <= response.json().items()
 
 
+@pytest.mark.anyio
+async def test_confirm_user_invalidates_cached_user(async_client: AsyncClient, mocker):
+    spy = mocker.spy(Request, "url_for")
+    await register_user(async_client, email="test@example.com", password="1234")
+    security.user_cache.set("test@example.com", "stale user")
+    await async_client.get(str(spy.spy_return))
+    assert security.user_cache.get("test@example.com") is None
+
+
 @pytest.mark.anyio
 async def test_confirm_user_invalid_token(async_client: AsyncClient):
     response = await async_client.get("users/confirm/invalid_token")
@@ -89,3 +120,51 @@ async def test_confirm_user_expired(async_client: AsyncClient, mocker):
     response = await async_client.get(confirmation_url)
     assert response.status_code == 401
     assert response.json()["detail"] == "Token has expired"
+
+
+@pytest.mark.anyio
+async def test_follow_user(
+    async_client: AsyncClient, logged_in_token: str, other_logged_in_token: str, follow
+):
+    response = await follow(1, async_client, other_logged_in_token)
+    assert response.status_code == 201
+    assert response.json() == {"follower_id": 2, "followee_id": 1}
+    user = await security.get_user("test@example.com")
+    assert user.follower_count == 1
+
+
+@pytest.mark.anyio
+async def test_follow_user_twice(
+    async_client: AsyncClient, logged_in_token: str, other_logged_in_token: str, follow
+):
+    await follow(1, async_client, other_logged_in_token)
+    response = await follow(1, async_client, other_logged_in_token)
+    assert response.status_code == 409
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("user_id, status_code", [(1, 400), (99, 404)])
+async def test_follow_user_invalid(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    user_id: int,
+    status_code: int,
+    follow,
+):
+    response = await follow(user_id, async_client, logged_in_token)
+    assert response.status_code == status_code
+
+
+@pytest.mark.anyio
+async def test_unfollow_user(
+    async_client: AsyncClient, logged_in_token: str, other_logged_in_token: str, follow
+):
+    headers = {"Authorization": f"Bearer {other_logged_in_token}"}
+    await follow(1, async_client, other_logged_in_token)
+    response = await async_client.delete("/users/1/follow", headers=headers)
+    assert response.status_code == 204
+    user = await security.get_user("test@example.com")
+    assert user.follower_count == 0
+
+    response = await async_client.delete("/users/1/follow", headers=headers)
+    assert response.status_code == 404
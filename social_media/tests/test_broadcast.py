@@ -0,0 +1,117 @@
+import pytest
+
+from social_media.broadcast import BroadcastHub
+from social_media.config import config
+from social_media.routers.events import stream_events
+
+
+@pytest.fixture()
+def hub() -> BroadcastHub:
+    return BroadcastHub(
+        queue_size=2, history_size=3, max_subscribers=2, like_interval_seconds=60
+    )
+
+
+def queued(subscriber) -> list:
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+def test_publish_encodes_event(hub: BroadcastHub):
+    subscriber = hub.subscribe()
+    hub.publish("post", {"id": 1})
+    (event,) = queued(subscriber)
+    assert event.id == hub.last_event_id
+    assert event.message == b'id: %d\nevent: post\ndata: {"id":1}\n\n' % event.id
+
+
+def test_slow_subscriber_evicted(hub: BroadcastHub):
+    slow = hub.subscribe()
+    fast = hub.subscribe()
+    hub.publish("post", {"id": 1})
+    queued(fast)
+    hub.publish("post", {"id": 2})
+    hub.publish("post", {"id": 3})
+
+    assert queued(slow) == [None]
+    assert len(queued(fast)) == 2
+    assert hub.stats()["evicted"] == 1
+    assert hub.stats()["subscribers"] == 1
+
+
+def test_max_subscribers(hub: BroadcastHub):
+    hub.subscribe()
+    hub.subscribe()
+    assert hub.subscribe() is None
+
+
+def test_resume_from_last_event_id(hub: BroadcastHub):
+    hub.publish("post", {"id": 1})
+    last_seen = hub.last_event_id
+    hub.publish("post", {"id": 2})
+    hub.publish("comment", {"id": 1})
+
+    subscriber = hub.subscribe(last_seen)
+
+    assert [event.id for event in queued(subscriber)] == [last_seen + 1, last_seen + 2]
+    assert queued(hub.subscribe(hub.last_event_id)) == []
+
+
+@pytest.mark.parametrize("behind", [4, 3, -1])
+def test_resume_too_far_behind_resets(hub: BroadcastHub, behind: int):
+    for i in range(4):
+        hub.publish("post", {"id": i})
+
+    subscriber = hub.subscribe(hub.last_event_id - behind)
+
+    # 4 missed events left the history, 3 do not fit the queue, -1 is unknown
+    (event,) = queued(subscriber)
+    assert b"event: reset" in event.message
+    assert hub.resets == 1
+
+
+@pytest.mark.anyio
+async def test_likes_coalesced_while_running(hub: BroadcastHub):
+    hub.queue_size = 3
+    subscriber = hub.subscribe()
+    await hub.start()
+    hub.publish_like(1, 1)
+    hub.publish_like(1, 2)
+    hub.publish_like(2, 1)
+    assert queued(subscriber) == []
+
+    await hub.stop()
+
+    events = queued(subscriber)
+    assert [event.message.split(b"data: ")[1] for event in events[:-1]] == [
+        b'{"post_id":1,"likes":2}\n\n',
+        b'{"post_id":2,"likes":1}\n\n',
+    ]
+    assert events[-1] is None
+    assert hub.coalesced_likes == 1
+
+
+@pytest.mark.anyio
+async def test_stream_events_until_closed(hub: BroadcastHub):
+    subscriber = hub.subscribe()
+    hub.publish("post", {"id": 1})
+    subscriber.close()
+
+    messages = [message async for message in stream_events(hub, subscriber)]
+
+    assert len(messages) == 1
+    assert messages[0].startswith(b"id: ")
+    assert hub.stats()["subscribers"] == 0
+
+
+@pytest.mark.anyio
+async def test_stream_events_keepalive(hub: BroadcastHub, mocker):
+    mocker.patch.object(config, "BROADCAST_KEEPALIVE_SECONDS", 0.01)
+    subscriber = hub.subscribe()
+    stream = stream_events(hub, subscriber)
+
+    assert await anext(stream) == b": keepalive\n\n"
+    await stream.aclose()
+    assert hub.stats()["subscribers"] == 0
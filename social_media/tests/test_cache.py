@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from social_media.cache import SingleFlight, TTLCache
+
+
+@pytest.fixture()
+def clock(mocker):
+    clock = mocker.patch("social_media.cache.time.monotonic", return_value=100.0)
+    return clock
+
+
+def test_get_set():
+    cache = TTLCache(maxsize=2, ttl=10)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats() == {
+        "size": 1,
+        "maxsize": 2,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+    }
+
+
+def test_expiry(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    clock.return_value = 109.0
+    assert cache.get("a") == 1
+    clock.return_value = 110.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_override_only_shortens(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2, ttl=100)
+    clock.return_value = 105.0
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    clock.return_value = 111.0
+    assert cache.get("long") is None
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_invalidate():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None
+
+
+@pytest.mark.parametrize("maxsize, ttl", [(0, 10), (2, 0)])
+def test_disabled(maxsize: int, ttl: float):
+    cache = TTLCache(maxsize=maxsize, ttl=ttl)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+@pytest.mark.anyio
+async def test_single_flight_shares_result():
+    flights = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flights.run("a", compute) for _ in range(5)))
+    assert results == [1] * 5
+    assert flights.stats() == {"in_flight": 0, "shared": 4}
+    assert await flights.run("a", compute) == 2
+
+
+@pytest.mark.anyio
+async def test_single_flight_shares_exception():
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        flights.run("a", compute), flights.run("a", compute), return_exceptions=True
+    )
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert flights.stats()["in_flight"] == 0
+
+
+@pytest.mark.anyio
+async def test_single_flight_leader_cancelled():
+    flights = SingleFlight()
+    started = asyncio.Event()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await asyncio.sleep(0.01)
+        return calls
+
+    leader = asyncio.create_task(flights.run("a", compute))
+    await started.wait()
+    followers = asyncio.gather(*(flights.run("a", compute) for _ in range(2)))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await followers == [2, 2]
+    assert leader.cancelled()
+    assert flights.stats() == {"in_flight": 0, "shared": 1}
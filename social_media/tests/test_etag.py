@@ -0,0 +1,33 @@
+import pytest
+from fastapi import Request
+
+from social_media.etag import etag_matches, make_etag
+
+
+def request_with(if_none_match: str | None) -> Request:
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "headers": headers})
+
+
+def test_make_etag_is_quoted_and_stable():
+    etag = make_etag([(1, 2)], None)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag([(1, 2)], None)
+    assert etag != make_etag([(1, 3)], None)
+
+
+@pytest.mark.parametrize(
+    "if_none_match, matches",
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ("*", True),
+        ('"xyz"', False),
+    ],
+)
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(request_with(if_none_match), '"abc"') is matches
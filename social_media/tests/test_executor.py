@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from social_media.executor import BoundedExecutor, ExecutorSaturatedError
+
+
+@pytest.fixture()
+def executor():
+    executor = BoundedExecutor(name="test", max_workers=2, max_pending=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_run(executor: BoundedExecutor):
+    assert await executor.run(pow, 2, 10) == 1024
+    assert await executor.run(threading.current_thread) != threading.main_thread()
+    assert executor.stats()["completed"] == 2
+
+
+@pytest.mark.anyio
+async def test_run_saturated(executor: BoundedExecutor):
+    executor.pending = executor.max_pending
+    with pytest.raises(ExecutorSaturatedError):
+        await executor.run(pow, 2, 10)
+    assert executor.stats()["rejected"] == 1
+
+
+def test_stats(executor: BoundedExecutor):
+    executor.pending = 3
+    assert executor.stats() == {
+        "workers": 2,
+        "max_pending": 2,
+        "running": 2,
+        "queued": 1,
+        "utilization": 1.0,
+        "completed": 0,
+        "rejected": 0,
+    }
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from social_media.database import database, post_table
+from social_media.like_buffer import LikeBuffer, like_buffer
+
+
+@pytest.fixture()
+async def buffered_likes():
+    await like_buffer.start()
+    yield like_buffer
+    await like_buffer.stop()
+
+
+async def stored_like_count(post_id: int) -> int:
+    query = post_table.select().where(post_table.c.id == post_id)
+    return (await database.fetch_one(query)).like_count
+
+
+@pytest.mark.anyio
+async def test_buffered_like_counts_before_flush(
+    async_client: AsyncClient,
+    created_post: dict,
+    logged_in_token: str,
+    other_logged_in_token: str,
+    buffered_likes: LikeBuffer,
+    like_post,
+):
+    response = await like_post(created_post["id"], async_client, logged_in_token)
+    assert response.status_code == 202
+    assert response.json()["id"] is None
+    await like_post(created_post["id"], async_client, other_logged_in_token)
+
+    response = await async_client.get("/posts/post")
+    assert response.json()["posts"][0]["likes"] == 2
+    assert await stored_like_count(created_post["id"]) == 0
+
+    assert await buffered_likes.flush() == 2
+    assert await stored_like_count(created_post["id"]) == 2
+    assert buffered_likes.pending_likes(created_post["id"]) == 0
+    response = await async_client.get("/posts/post")
+    assert response.json()["posts"][0]["likes"] == 2
+
+
+@pytest.mark.anyio
+async def test_buffered_like_twice(
+    async_client: AsyncClient,
+    created_post: dict,
+    logged_in_token: str,
+    buffered_likes: LikeBuffer,
+    like_post,
+):
+    await like_post(created_post["id"], async_client, logged_in_token)
+    response = await like_post(created_post["id"], async_client, logged_in_token)
+    assert response.status_code == 409
+
+
+@pytest.mark.anyio
+async def test_buffered_like_already_stored(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, like_post
+):
+    await like_post(created_post["id"], async_client, logged_in_token)
+    await like_buffer.start()
+    try:
+        response = await like_post(created_post["id"], async_client, logged_in_token)
+    finally:
+        await like_buffer.stop()
+    assert response.status_code == 409
+    assert like_buffer.pending_likes(created_post["id"]) == 0
+
+
+@pytest.mark.anyio
+async def test_buffered_like_post_not_found(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    buffered_likes: LikeBuffer,
+    like_post,
+):
+    response = await like_post(99, async_client, logged_in_token)
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_flush_skips_stored_likes(
+    async_client: AsyncClient,
+    created_post: dict,
+    logged_in_token: str,
+    confirmed_user: dict,
+    like_post,
+):
+    await like_post(created_post["id"], async_client, logged_in_token)
+    await like_buffer.start()
+    like_buffer.add(created_post["id"], confirmed_user["id"])
+    await like_buffer.stop()
+    assert await stored_like_count(created_post["id"]) == 1
+
+
+@pytest.mark.anyio
+async def test_stop_flushes(created_post: dict, confirmed_user: dict):
+    await like_buffer.start()
+    like_buffer.add(created_post["id"], confirmed_user["id"])
+    await like_buffer.stop()
+    assert like_buffer.stats()["pending"] == 0
+    assert await stored_like_count(created_post["id"]) == 1
+
+
+@pytest.mark.anyio
+async def test_flush_when_full(async_client: AsyncClient, logged_in_token: str):
+    for i in range(2):
+        await async_client.post(
+            "/posts/post",
+            json={"body": f"Test post {i}"},
+            headers={"Authorization": f"Bearer {logged_in_token}"},
+        )
+    buffer = LikeBuffer(max_size=2, flush_interval_seconds=60)
+    await buffer.start()
+    buffer.add(1, 1)
+    buffer.add(2, 1)
+    for _ in range(100):
+        if buffer.flushed:
+            break
+        await asyncio.sleep(0.01)
+    assert buffer.flushed == 2
+    await buffer.stop()
@@ -0,0 +1,94 @@
+import logging
+import queue
+import threading
+
+import pytest
+
+from social_media.logging_config import (
+    BoundedQueueHandler,
+    EmailObfuscationFilter,
+    obfuscated,
+    start_log_listener,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append((record, threading.current_thread()))
+
+
+@pytest.fixture()
+def logger():
+    logger = logging.getLogger("social_media.tests.queued")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    yield logger
+    logger.handlers.clear()
+
+
+def test_obfuscated():
+    assert obfuscated("test@example.com", 2) == "te**@example.com"
+
+
+def test_queue_handler_drops_when_full():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1), overflow="drop")
+    record = logging.makeLogRecord({"msg": "test"})
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_queue_handler_blocks_when_full():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1), overflow="block")
+    record = logging.makeLogRecord({"msg": "test"})
+    handler.handle(record)
+    blocked = threading.Thread(target=handler.handle, args=(record,))
+    blocked.start()
+    blocked.join(timeout=0.1)
+    assert blocked.is_alive()
+    handler.queue.get()
+    blocked.join(timeout=1)
+    assert not blocked.is_alive()
+    assert handler.dropped == 0
+
+
+def test_start_log_listener(logger: logging.Logger):
+    target = ListHandler()
+    target.addFilter(EmailObfuscationFilter(obfuscated_length=1))
+    logger.addHandler(target)
+
+    listener = start_log_listener(logger)
+    logger.info("Hello %s", "world", extra={"email": "test@example.com"})
+    listener.stop()
+
+    assert isinstance(logger.handlers[0], BoundedQueueHandler)
+    [(record, thread)] = target.records
+    assert record.getMessage() == "Hello world"
+    assert record.email == "t***@example.com"
+    assert thread is not threading.current_thread()
+
+
+def test_start_log_listener_leaves_shared_handler_filters(logger: logging.Logger):
+    target = ListHandler()
+    email_filter = EmailObfuscationFilter(obfuscated_length=1)
+    target.addFilter(email_filter)
+    logger.addHandler(target)
+    other_logger = logging.getLogger("social_media.tests.shared")
+    other_logger.propagate = False
+    other_logger.addHandler(target)
+
+    listener = start_log_listener(logger)
+    other_logger.warning("Direct", extra={"email": "other@example.com"})
+    logger.info("Queued", extra={"email": "test@example.com"})
+    listener.stop()
+    other_logger.handlers.clear()
+
+    assert target.filters == [email_filter]
+    emails = sorted(record.email for record, _ in target.records)
+    # Obfuscated once each, whether queued or not
+    assert emails == ["o****@example.com", "t***@example.com"]
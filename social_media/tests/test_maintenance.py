@@ -0,0 +1,37 @@
+import pytest
+
+from social_media.database import database, like_table, post_table
+from social_media.maintenance import rebuild_search_index, reconcile_like_counts
+
+
+@pytest.mark.anyio
+async def test_reconcile_like_counts(confirmed_user: dict):
+    post_id = await database.execute(
+        post_table.insert().values(body="Test post", user_id=confirmed_user["id"])
+    )
+    await database.execute(
+        like_table.insert().values(post_id=post_id, user_id=confirmed_user["id"])
+    )
+
+    assert await reconcile_like_counts() == 1
+    query = post_table.select().where(post_table.c.id == post_id)
+    assert (await database.fetch_one(query)).like_count == 1
+
+
+@pytest.mark.anyio
+async def test_reconcile_like_counts_nothing_to_fix():
+    assert await reconcile_like_counts() == 0
+
+
+@pytest.mark.anyio
+async def test_rebuild_search_index(confirmed_user: dict):
+    await database.execute(
+        post_table.insert().values(body="Findable post", user_id=confirmed_user["id"])
+    )
+    # Empty the index behind the triggers' back, as if rows had been imported
+    await database.execute("INSERT INTO posts_fts (posts_fts) VALUES ('delete-all')")
+    query = "SELECT count(*) FROM posts_fts WHERE posts_fts MATCH 'findable'"
+    assert await database.fetch_val(query) == 0
+
+    await rebuild_search_index()
+    assert await database.fetch_val(query) == 1
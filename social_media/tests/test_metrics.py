@@ -0,0 +1,45 @@
+from social_media import metrics
+from social_media.metrics import Counter, Histogram, route_template
+
+
+def test_histogram_render_is_cumulative():
+    histogram = Histogram("test_seconds", "Test", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    lines = histogram.render()
+    metrics.registry.remove(histogram)
+
+    assert lines[2:] == [
+        'test_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_seconds_bucket{route="/a",le="1"} 2',
+        'test_seconds_bucket{route="/a",le="+Inf"} 3',
+        'test_seconds_sum{route="/a"} 5.55',
+        'test_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_counter_render_escapes_labels():
+    counter = Counter("test_total", "Test", ("query",))
+    counter.inc('SELECT "a"\nFROM b')
+    counter.inc('SELECT "a"\nFROM b', amount=2)
+
+    lines = counter.render()
+    metrics.registry.remove(counter)
+
+    assert lines == [
+        "# HELP test_total Test",
+        "# TYPE test_total counter",
+        'test_total{query="SELECT \\"a\\"\\nFROM b"} 3',
+    ]
+
+
+def test_route_template():
+    scope = {
+        "route": object(),
+        "path": "/posts/post/5/comment",
+        "path_params": {"post_id": 5},
+    }
+    assert route_template(scope) == "/posts/post/{post_id}/comment"
+    assert route_template({"path": "/nowhere"}) == "unmatched"
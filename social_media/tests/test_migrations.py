@@ -0,0 +1,106 @@
+import pytest
+import sqlalchemy
+
+from social_media.database import metadata
+from social_media.migrations import get_version, latest_version, migrate
+
+baseline_schema = [
+    (
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR UNIQUE, "
+        "password VARCHAR, confirmed BOOLEAN)"
+    ),
+    "CREATE TABLE posts (id INTEGER PRIMARY KEY, body VARCHAR, user_id INTEGER)",
+    (
+        "CREATE TABLE comments (id INTEGER PRIMARY KEY, body VARCHAR, "
+        "post_id INTEGER NOT NULL, user_id INTEGER)"
+    ),
+    (
+        "CREATE TABLE likes (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, "
+        "user_id INTEGER)"
+    ),
+]
+
+
+@pytest.fixture()
+def connection():
+    engine = sqlalchemy.create_engine("sqlite://")
+    with engine.begin() as connection:
+        yield connection
+
+
+def test_migrate_new_database(connection):
+    assert migrate(connection, metadata) == latest_version()
+    assert get_version(connection) == latest_version()
+    indexes = sqlalchemy.inspect(connection).get_indexes("likes")
+    assert {"uq_likes_post_id_user_id", "ix_likes_user_id"} <= {
+        index["name"] for index in indexes
+    }
+
+
+def test_migrate_existing_database(connection):
+    for statement in baseline_schema:
+        connection.execute(sqlalchemy.text(statement))
+    connection.execute(sqlalchemy.text("INSERT INTO posts (id, body) VALUES (1, 'a')"))
+    connection.execute(
+        sqlalchemy.text(
+            "INSERT INTO likes (post_id, user_id) VALUES (1, 1), (1, 1), (1, 2)"
+        )
+    )
+
+    assert migrate(connection, metadata) == latest_version()
+
+    like_count = connection.execute(
+        sqlalchemy.text("SELECT like_count FROM posts WHERE id = 1")
+    ).scalar_one()
+    assert like_count == 2
+    inspector = sqlalchemy.inspect(connection)
+    assert "ix_comments_post_id_id" in {
+        index["name"] for index in inspector.get_indexes("comments")
+    }
+
+
+def test_migrate_to_target(connection):
+    for statement in baseline_schema:
+        connection.execute(sqlalchemy.text(statement))
+    assert migrate(connection, metadata, target=1) == 1
+    assert sqlalchemy.inspect(connection).get_indexes("likes") == []
+    assert migrate(connection, metadata) == latest_version()
+
+
+def test_migrate_is_idempotent(connection):
+    migrate(connection, metadata)
+    assert migrate(connection, metadata) == latest_version()
+
+
+def test_migrate_indexes_existing_posts_for_search(connection):
+    for statement in baseline_schema:
+        connection.execute(sqlalchemy.text(statement))
+    connection.execute(
+        sqlalchemy.text("INSERT INTO posts (id, body) VALUES (1, 'hello world')")
+    )
+    migrate(connection, metadata)
+    connection.execute(
+        sqlalchemy.text("INSERT INTO posts (id, body) VALUES (2, 'hello again')")
+    )
+    matches = connection.execute(
+        sqlalchemy.text("SELECT rowid FROM posts_fts WHERE posts_fts MATCH 'hello'")
+    ).scalars()
+    assert sorted(matches) == [1, 2]
+
+
+def test_migrate_timestamps_posts_and_likes(connection):
+    for statement in baseline_schema:
+        connection.execute(sqlalchemy.text(statement))
+    connection.execute(sqlalchemy.text("INSERT INTO posts (id, body) VALUES (1, 'a')"))
+    migrate(connection, metadata)
+    connection.execute(sqlalchemy.text("INSERT INTO posts (id, body) VALUES (2, 'b')"))
+    connection.execute(
+        sqlalchemy.text("INSERT INTO likes (post_id, user_id) VALUES (2, 1)")
+    )
+
+    for table in ("posts", "likes"):
+        missing = connection.execute(
+            sqlalchemy.text(f"SELECT count(*) FROM {table} WHERE created_at IS NULL")
+        ).scalar_one()
+        assert missing == 0
+    assert sqlalchemy.inspect(connection).has_table("post_trending")
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from social_media.profiler import (
+    Profile,
+    ProfileStore,
+    SamplingProfiler,
+    awaiting_stack,
+)
+
+
+@pytest.fixture()
+async def sampling_profiler():
+    # Sampled by hand: the thread would only take its first sample in a minute
+    profiler = SamplingProfiler(
+        interval_seconds=60, max_bytes=1000, sample_rate=0, token="secret"
+    )
+    await profiler.start()
+    yield profiler
+    await profiler.stop()
+
+
+def finished_profile(id: str, size: int) -> Profile:
+    profile = Profile(id, "GET", "/", None)
+    profile.folded = b"x" * size
+    return profile
+
+
+def test_store_evicts_oldest_over_max_bytes():
+    store = ProfileStore(max_bytes=100)
+    store.add(finished_profile("a", 40))
+    store.add(finished_profile("b", 40))
+    store.add(finished_profile("c", 40))
+
+    assert store.get("a") is None
+    assert [summary["id"] for summary in store.summaries()] == ["c", "b"]
+    assert store.stats()["bytes"] == 80
+    assert store.stats()["evicted"] == 1
+
+
+def test_store_rejects_profile_larger_than_max_bytes():
+    store = ProfileStore(max_bytes=100)
+    store.add(finished_profile("a", 40))
+
+    assert not store.add(finished_profile("b", 101))
+    assert store.get("a") is not None
+    assert store.stats()["rejected"] == 1
+
+
+def test_store_replaces_profile_with_same_id():
+    store = ProfileStore(max_bytes=100)
+    store.add(finished_profile("a", 40))
+    store.add(finished_profile("a", 30))
+
+    assert store.stats()["profiles"] == 1
+    assert store.stats()["bytes"] == 30
+
+
+# Before Python 3.11, frames are labelled without their class
+EVENT_WAIT = getattr(asyncio.Event.wait.__code__, "co_qualname", "wait")
+
+
+async def wait_for(event: asyncio.Event) -> None:
+    await event.wait()
+
+
+@pytest.mark.anyio
+async def test_awaiting_stack():
+    event = asyncio.Event()
+    task = asyncio.create_task(wait_for(event))
+    await asyncio.sleep(0)
+
+    stack = awaiting_stack(task.get_coro())
+
+    assert stack[0].startswith("wait_for (")
+    assert stack[1].startswith(f"{EVENT_WAIT} (asyncio/locks.py:")
+    event.set()
+    await task
+
+
+def test_authorized():
+    profiler = SamplingProfiler(
+        interval_seconds=1, max_bytes=1000, sample_rate=0, token="secret"
+    )
+    assert profiler.authorized("secret")
+    assert not profiler.authorized("wrong")
+    assert not profiler.authorized(None)
+    profiler.token = None
+    assert not profiler.authorized("")
+
+
+def test_wants_token_header_or_sample_rate():
+    profiler = SamplingProfiler(
+        interval_seconds=1, max_bytes=1000, sample_rate=0, token="secret"
+    )
+    assert profiler.wants({"headers": [(b"x-profile-token", b"secret")]})
+    assert not profiler.wants({"headers": [(b"x-profile-token", b"wrong")]})
+    assert not profiler.wants({"headers": []})
+    profiler.sample_rate = 1
+    assert profiler.wants({"headers": []})
+
+
+async def profiled_wait(profiler: SamplingProfiler, started, release) -> None:
+    profile = profiler.begin("waiting", "GET", "/wait")
+    started.set()
+    await release.wait()
+    profiler.end(profile, 200)
+
+
+@pytest.mark.anyio
+async def test_sample_running_and_awaiting_requests(sampling_profiler):
+    started, release = asyncio.Event(), asyncio.Event()
+    waiting = asyncio.create_task(profiled_wait(sampling_profiler, started, release))
+    await started.wait()
+    profile = sampling_profiler.begin("running", "POST", "/run")
+
+    sampling_profiler.sample()
+    sampling_profiler.end(profile, 201)
+    release.set()
+    await waiting
+
+    running = sampling_profiler.store.get("running")
+    assert running.summary()["status"] == 201
+    assert running.summary()["samples"] == running.summary()["running_samples"] == 1
+    assert b"test_sample_running_and_awaiting_requests (" in running.folded
+    # Only frames from the task's own coroutine on, not the event loop's
+    assert not running.folded.startswith(b"BaseEventLoop")
+
+    waited = sampling_profiler.store.get("waiting")
+    assert waited.summary()["running_samples"] == 0
+    stack, count = waited.folded.decode().rstrip("\n").rsplit(" ", 1)
+    assert stack.startswith("profiled_wait (")
+    assert f";{EVENT_WAIT} (asyncio/locks.py:" in stack
+    assert count == "1"
+    assert sampling_profiler.stats()["active"] == 0
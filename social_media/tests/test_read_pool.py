@@ -0,0 +1,49 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from social_media.database import create_read_database, database
+from social_media.read_pool import SQLiteReadDatabase
+
+
+@pytest.fixture()
+async def read_database(tmp_path):
+    path = tmp_path / "read.db"
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, body VARCHAR)")
+    connection.execute("INSERT INTO posts (body) VALUES ('Test post')")
+    connection.commit()
+    connection.close()
+
+    read_database = SQLiteReadDatabase(f"sqlite:///{path}", pool_size=2)
+    await read_database.connect()
+    yield read_database
+    await read_database.disconnect()
+
+
+@pytest.mark.anyio
+async def test_read_pool_fetch(read_database: SQLiteReadDatabase):
+    post = await read_database.fetch_one("SELECT id, body FROM posts")
+    assert (post.id, post.body) == (1, "Test post")
+    assert read_database.stats() == {"size": 2, "in_use": 0}
+
+
+@pytest.mark.anyio
+async def test_read_pool_concurrent_reads(read_database: SQLiteReadDatabase):
+    async def read():
+        return await read_database.fetch_val("SELECT count(*) FROM posts")
+
+    assert await asyncio.gather(*[read() for _ in range(10)]) == [1] * 10
+    assert read_database.stats()["in_use"] == 0
+
+
+@pytest.mark.anyio
+async def test_read_pool_rejects_writes(read_database: SQLiteReadDatabase):
+    with pytest.raises(sqlite3.OperationalError):
+        await read_database.execute("INSERT INTO posts (body) VALUES ('x')")
+
+
+def test_read_database_is_writer_when_rolling_back():
+    assert create_read_database() is database
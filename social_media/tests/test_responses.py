@@ -0,0 +1,54 @@
+import pytest
+import sqlalchemy
+from fastapi import Response
+
+from social_media import sql
+from social_media.config import config
+from social_media.database import post_table
+from social_media.models.post import UserPost, UserPostWithLikes
+from social_media.responses import ORJSONResponse, RecordSerializer
+from social_media.routers.post import json_response
+
+
+async def fetch_posts() -> list:
+    query = post_table.insert().values(body="Test post", user_id=1)
+    await sql.execute(query)
+    query = sqlalchemy.select(
+        post_table.c.id,
+        post_table.c.body,
+        post_table.c.user_id,
+        post_table.c.like_count.label("likes"),
+    )
+    return await sql.fetch_all(query)
+
+
+@pytest.mark.anyio
+async def test_record_serializer():
+    serialize = RecordSerializer(UserPostWithLikes)
+    assert serialize([]) == []
+    assert serialize(await fetch_posts()) == [
+        {"id": 1, "body": "Test post", "user_id": 1, "likes": 0}
+    ]
+    assert serialize.checked
+
+
+@pytest.mark.anyio
+async def test_record_serializer_rejects_other_columns():
+    serialize = RecordSerializer(UserPost)
+    with pytest.raises(ValueError):
+        serialize(await fetch_posts())
+
+
+def test_json_response_fast(mocker):
+    mocker.patch.object(config, "FAST_JSON_ENABLED", True)
+    result = json_response({"a": 1}, Response(), headers={"ETag": '"x"'})
+    assert isinstance(result, ORJSONResponse)
+    assert result.body == b'{"a":1}'
+    assert result.headers["etag"] == '"x"'
+
+
+def test_json_response_disabled(mocker):
+    mocker.patch.object(config, "FAST_JSON_ENABLED", False)
+    response = Response()
+    assert json_response({"a": 1}, response, headers={"ETag": '"x"'}) == {"a": 1}
+    assert response.headers["etag"] == '"x"'
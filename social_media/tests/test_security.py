@@ -1,7 +1,10 @@
+import time
+
 import pytest
 from fastapi import HTTPException
 from jose import jwt
 
+from social_media import security
 from social_media.security import (
     ALGORITHM,
     SECRURITY_KEY,
@@ -15,7 +18,10 @@ from social_media.security import (
     get_subject_for_token_type,
     get_user,
     hash_password,
+    hash_password_in_pool,
+    invalidate_user,
     verify_password,
+    verify_password_in_pool,
 )
 
 
@@ -109,6 +115,14 @@ async def test_password_hashes():
     assert verify_password(password, hashed_password)
 
 
+@pytest.mark.anyio
+async def test_password_hashes_in_pool():
+    password = "1234"
+    hashed_password = await hash_password_in_pool(password)
+    assert await verify_password_in_pool(password, hashed_password)
+    assert not await verify_password_in_pool("wrong password", hashed_password)
+
+
 @pytest.mark.anyio
 async def test_get_user(confirmed_user: dict):
     user = await get_user(confirmed_user["email"])
@@ -176,3 +190,43 @@ async def test_get_current_user_wrong_type_token(confirmed_user: dict):
     with pytest.raises(HTTPException) as exc_info:
         await get_current_user(token)
     assert exc_info.value.detail == "Invalid token type, expeted 'access'"
+
+
+@pytest.mark.anyio
+async def test_get_current_user_cached(confirmed_user: dict, mocker):
+    token = create_access_token(confirmed_user["email"])
+    await get_current_user(token)
+    decode = mocker.spy(security, "decode_token")
+    get_user = mocker.spy(security, "get_user")
+    hits = security.user_cache.hits
+    user = await get_current_user(token)
+    assert user.email == confirmed_user["email"]
+    decode.assert_not_called()
+    get_user.assert_not_called()
+    assert security.user_cache.hits == hits + 1
+
+
+@pytest.mark.anyio
+async def test_get_current_user_invalidated(confirmed_user: dict, mocker):
+    token = create_access_token(confirmed_user["email"])
+    await get_current_user(token)
+    invalidate_user(confirmed_user["email"])
+    get_user = mocker.spy(security, "get_user")
+    await get_current_user(token)
+    get_user.assert_called_once_with(email=confirmed_user["email"])
+
+
+@pytest.mark.anyio
+async def test_get_current_user_cached_token_expires(confirmed_user: dict, mocker):
+    # Token valid for 3 seconds, well below the cache TTL
+    mocker.patch(
+        "social_media.security.access_token_expire_minutes", return_value=0.05
+    )
+    token = create_access_token(confirmed_user["email"])
+    await get_current_user(token)
+    mocker.patch(
+        "social_media.cache.time.monotonic", return_value=time.monotonic() + 5
+    )
+    decode = mocker.spy(security, "decode_token")
+    await get_current_user(token)
+    decode.assert_called_once()
@@ -0,0 +1,59 @@
+import logging
+
+import pytest
+import sqlalchemy
+
+from social_media import sql
+from social_media.database import like_table, post_table
+
+
+def test_statement_name_select():
+    by_id = post_table.select().where(post_table.c.id == 1)
+    by_user = post_table.select().where(post_table.c.user_id == 2)
+    assert sql.statement_name(by_id) == sql.statement_name(by_user) == "SELECT posts"
+
+
+def test_statement_name_join():
+    query = sqlalchemy.select(post_table.c.id).select_from(post_table.join(like_table))
+    assert sql.statement_name(query) == "SELECT posts, likes"
+
+
+def test_statement_name_insert_any_row_count():
+    one = post_table.insert().values([{"body": "a", "user_id": 1}])
+    two = post_table.insert().values([{"body": "a", "user_id": 1}] * 2)
+    assert sql.statement_name(one) == sql.statement_name(two) == "INSERT posts"
+
+
+def test_statement_name_text():
+    assert sql.statement_name("pragma optimize") == "PRAGMA"
+
+
+def test_record_timing_bounded(mocker):
+    mocker.patch.object(sql, "query_timings", {})
+    mocker.patch.object(sql, "MAX_QUERY_NAMES", 1)
+    sql.record_timing("SELECT a", 0.001)
+    sql.record_timing("SELECT b", 0.001)
+    sql.record_timing("SELECT c", 0.001)
+    assert sql.query_timings.keys() == {"SELECT a", "other"}
+    assert sql.query_timings["other"]["count"] == 2
+
+
+def test_record_timing():
+    sql.record_timing("SELECT test", 0.002)
+    sql.record_timing("SELECT test", 0.001)
+    assert sql.query_stats()["SELECT test"] == {
+        "count": 2,
+        "total_ms": pytest.approx(3),
+        "max_ms": pytest.approx(2),
+    }
+    del sql.query_timings["SELECT test"]
+
+
+@pytest.mark.anyio
+async def test_fetch_one_timed(caplog):
+    query = post_table.select().where(post_table.c.id == 1)
+    count = sql.query_timings.get("SELECT posts", {}).get("count", 0)
+    with caplog.at_level(logging.DEBUG, logger="social_media.sql"):
+        assert await sql.fetch_one(query) is None
+    assert sql.query_timings["SELECT posts"]["count"] == count + 1
+    assert "FROM posts" in caplog.records[-1].getMessage()
@@ -0,0 +1,28 @@
+import sqlite3
+
+import pytest
+
+from social_media.config import config
+from social_media.database import database
+from social_media.sqlite_tuning import sqlite_pragmas, tuned_connection_factory
+
+
+def test_sqlite_pragmas():
+    assert "PRAGMA journal_mode=WAL" in sqlite_pragmas(config)
+    assert "PRAGMA busy_timeout=5000" in sqlite_pragmas(config)
+
+
+def test_tuned_connection_factory(tmp_path):
+    factory = tuned_connection_factory(
+        ["PRAGMA journal_mode=WAL", "PRAGMA cache_size=-1234"]
+    )
+    connection = sqlite3.connect(tmp_path / "test.db", factory=factory)
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert connection.execute("PRAGMA cache_size").fetchone() == (-1234,)
+    connection.close()
+
+
+@pytest.mark.anyio
+async def test_database_connections_tuned():
+    assert await database.fetch_val("PRAGMA busy_timeout") == 5000
+    assert await database.fetch_val("PRAGMA temp_store") == 2
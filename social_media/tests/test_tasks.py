@@ -3,6 +3,13 @@ import pytest
 from social_media.tasks import send_simple_mail, APIResponseError
 import httpx
 
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from social_media import tasks
+from social_media.metrics import mailgun_duration
+from social_media.tasks import MailDispatcher
+
 
 @pytest.mark.anyio
 async def test_send_simple_mail(mock_httpx_client):
@@ -18,3 +25,116 @@ async def test_send_simple_mail_error(mock_httpx_client):
     with pytest.raises(APIResponseError) as exc_info:
         await send_simple_mail(to="test@example.com", subject="test", body="test")
     assert "400" in str(exc_info.value)
+    assert (400,) in mailgun_duration.series
+
+
+@pytest.fixture()
+def mailgun_server():
+    """Local stand-in for the Mailgun API answering with queued status codes."""
+    statuses = []
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(self.rfile.read(int(self.headers["Content-Length"])))
+            self.send_response(statuses.pop(0) if statuses else 200)
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", statuses, received
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+async def stand_in_mailgun(mailgun_server, mocker):
+    url, statuses, received = mailgun_server
+    mocker.patch("social_media.tasks.config.MAILGUN_BASE_URL", url)
+    mocker.patch("social_media.tasks.config.MAILGUN_DOMAIN", "example.com")
+    mocker.patch("social_media.tasks.config.MAILGUN_API_KEY", "key")
+    async with httpx.AsyncClient() as client:
+        mocker.patch("social_media.tasks.http_client", client)
+        yield statuses, received
+
+
+@pytest.mark.anyio
+async def test_send_simple_mail_stand_in_server(stand_in_mailgun):
+    statuses, received = stand_in_mailgun
+    await send_simple_mail(to="test@example.com", subject="test", body="test")
+    assert len(received) == 1
+    statuses.append(500)
+    with pytest.raises(APIResponseError):
+        await send_simple_mail(to="test@example.com", subject="test", body="test")
+
+
+@pytest.mark.anyio
+async def test_send_simple_mail_outside_lifespan(stand_in_mailgun, mocker):
+    _, received = stand_in_mailgun
+    mocker.patch("social_media.tasks.http_client", None)
+    await send_simple_mail(to="test@example.com", subject="test", body="test")
+    assert len(received) == 1
+    assert tasks.http_client is None
+
+
+@pytest.mark.anyio
+async def test_mail_dispatcher_retries(stand_in_mailgun):
+    statuses, received = stand_in_mailgun
+    statuses.extend([500, 503])
+    dispatcher = MailDispatcher(
+        workers=1, max_queue=10, max_retries=3, retry_backoff_seconds=0
+    )
+    await dispatcher.start()
+    await dispatcher.enqueue(to="test@example.com", subject="test", body="test")
+    await dispatcher.stop()
+    assert len(received) == 3
+    assert dispatcher.stats() == {
+        "workers": 0,
+        "queued": 0,
+        "max_queue": 10,
+        "sent": 1,
+        "retried": 2,
+        "failed": 0,
+    }
+
+
+@pytest.mark.anyio
+async def test_mail_dispatcher_gives_up(stand_in_mailgun):
+    statuses, received = stand_in_mailgun
+    statuses.extend([500, 500])
+    dispatcher = MailDispatcher(
+        workers=1, max_queue=10, max_retries=1, retry_backoff_seconds=0
+    )
+    await dispatcher.start()
+    await dispatcher.enqueue(to="test@example.com", subject="test", body="test")
+    await dispatcher.stop()
+    assert len(received) == 2
+    assert dispatcher.failed == 1
+
+
+@pytest.mark.anyio
+async def test_mail_dispatcher_drains_on_stop(mock_httpx_client):
+    dispatcher = MailDispatcher(
+        workers=2, max_queue=10, max_retries=0, retry_backoff_seconds=0
+    )
+    await dispatcher.start()
+    for _ in range(5):
+        await dispatcher.enqueue(to="test@example.com", subject="test", body="test")
+    await dispatcher.stop()
+    assert mock_httpx_client.post.call_count == 5
+    assert not dispatcher.running
+
+
+@pytest.mark.anyio
+async def test_mail_dispatcher_not_running_sends_inline(mock_httpx_client):
+    dispatcher = MailDispatcher(
+        workers=1, max_queue=10, max_retries=0, retry_backoff_seconds=0
+    )
+    await dispatcher.enqueue(to="test@example.com", subject="test", body="test")
+    mock_httpx_client.post.assert_called_once()
+    assert dispatcher.sent == 1
@@ -0,0 +1,170 @@
+import asyncio
+import datetime
+
+import databases
+import pytest
+import sqlalchemy
+
+from social_media.config import config
+from social_media.database import (
+    database,
+    like_table,
+    metadata,
+    post_table,
+    post_trending_table,
+    trending_state_table,
+    user_table,
+)
+from social_media.migrations import migrate
+from social_media.sqlite_tuning import sqlite_pragmas, tuned_connection_factory
+from social_media.trending import REBASE_AFTER_HALF_LIVES, TrendingRanker
+
+now = datetime.datetime(2026, 1, 1, 12, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture()
+def ranker() -> TrendingRanker:
+    return TrendingRanker(
+        half_life_seconds=3600, refresh_interval_seconds=60, min_score=0.05
+    )
+
+
+async def add_like(post_id: int, user_id: int, hours_ago: float) -> None:
+    created_at = now - datetime.timedelta(hours=hours_ago)
+    await database.execute(
+        like_table.insert().values(
+            post_id=post_id, user_id=user_id, created_at=created_at.replace(tzinfo=None)
+        )
+    )
+
+
+async def scores() -> dict[int, float]:
+    rows = await database.fetch_all(sqlalchemy.select(post_trending_table))
+    return {row.post_id: row.score for row in rows}
+
+
+@pytest.fixture(autouse=True)
+async def posts():
+    await database.execute(
+        post_table.insert().values([{"body": "old"}, {"body": "new"}])
+    )
+
+
+@pytest.mark.anyio
+async def test_refresh_weights_likes_by_recency(ranker: TrendingRanker):
+    await add_like(1, 1, hours_ago=2)
+    await add_like(1, 2, hours_ago=2)
+    await add_like(2, 1, hours_ago=0)
+
+    await ranker.refresh(now=now.timestamp())
+
+    assert await scores() == pytest.approx({1: 0.5, 2: 1.0})
+    assert ranker.version == 1
+
+
+@pytest.mark.anyio
+async def test_refresh_only_scores_new_likes(ranker: TrendingRanker):
+    await add_like(1, 1, hours_ago=1)
+    await ranker.refresh(now=now.timestamp())
+    await add_like(1, 2, hours_ago=0)
+
+    # An hour later the stored scores are unchanged, they are relative to the epoch
+    await ranker.refresh(now=now.timestamp() + 3600)
+
+    assert await scores() == pytest.approx({1: 1.5})
+    assert ranker.last_like_id == 2
+    await ranker.refresh(now=now.timestamp() + 3600)
+    assert ranker.version == 2
+
+
+@pytest.mark.anyio
+async def test_refresh_prunes_decayed_posts(ranker: TrendingRanker):
+    await add_like(1, 1, hours_ago=10)
+    await add_like(2, 1, hours_ago=0)
+
+    await ranker.refresh(now=now.timestamp())
+
+    assert list(await scores()) == [2]
+    assert ranker.pruned == 1
+
+
+@pytest.mark.anyio
+async def test_refresh_rebases_old_epoch(ranker: TrendingRanker):
+    ranker.min_score = 0
+    await add_like(1, 1, hours_ago=0)
+    await ranker.refresh(now=now.timestamp())
+    later = now.timestamp() + (REBASE_AFTER_HALF_LIVES + 1) * 3600
+
+    await ranker.refresh(now=later)
+
+    assert ranker.rebases == 1
+    assert await scores() == pytest.approx({1: 2.0 ** -(REBASE_AFTER_HALF_LIVES + 1)})
+    epoch = await database.fetch_val(sqlalchemy.select(trending_state_table.c.epoch))
+    assert epoch == later
+
+
+@pytest.mark.anyio
+async def test_start_and_stop(ranker: TrendingRanker):
+    await add_like(1, 1, hours_ago=0)
+
+    await ranker.start()
+    await ranker.stop()
+
+    assert not ranker.running
+    assert ranker.stats()["refreshes"] == 1
+
+
+@pytest.fixture()
+async def file_database(tmp_path, mocker):
+    """A WAL database file the ranker uses, shared by concurrent connections."""
+    url = f"sqlite:///{tmp_path / 'trending.db'}"
+    factory = tuned_connection_factory(sqlite_pragmas(config))
+    engine = sqlalchemy.create_engine(url, connect_args={"factory": factory})
+    with engine.begin() as connection:
+        migrate(connection, metadata)
+        connection.execute(
+            user_table.insert().values(
+                [{"email": f"user{i}@example.com"} for i in range(16)]
+            )
+        )
+        connection.execute(
+            post_table.insert().values([{"body": f"Post {i}"} for i in range(10)])
+        )
+    engine.dispose()
+    file_database = databases.Database(url, factory=factory)
+    await file_database.connect()
+    mocker.patch("social_media.trending.database", file_database)
+    mocker.patch("social_media.sql.database", file_database)
+    yield file_database
+    await file_database.disconnect()
+
+
+@pytest.mark.anyio
+async def test_refresh_while_liking(
+    ranker: TrendingRanker, file_database: databases.Database
+):
+    async def like_posts(user_id: int) -> None:
+        # Like like_post, each transaction starts with its write
+        for post_id in range(1, 11):
+            async with file_database.transaction():
+                await file_database.execute(
+                    like_table.insert().values(post_id=post_id, user_id=user_id)
+                )
+                await file_database.execute(
+                    post_table.update()
+                    .where(post_table.c.id == post_id)
+                    .values(like_count=post_table.c.like_count + 1)
+                )
+
+    async def refresh_repeatedly() -> None:
+        for _ in range(20):
+            await ranker.refresh()
+            await asyncio.sleep(0)
+
+    await asyncio.gather(
+        refresh_repeatedly(), *(like_posts(user_id) for user_id in range(1, 17))
+    )
+    await ranker.refresh()
+
+    assert ranker.refreshes == 21
+    assert ranker.last_like_id == 160
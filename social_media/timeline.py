@@ -0,0 +1,134 @@
+"""Home timelines: posts of the users someone follows, newest first.
+
+Timelines are materialized on write: the id of a new post is pushed into the
+``timelines`` row of every follower of its author, so a page of a timeline is
+one range read of ``(user_id, post_id)`` however large the follow graph is.
+Pushing to every follower of a very popular author would make each of their
+posts as slow to create as they have followers, so once an author has more
+than TIMELINE_FANOUT_MAX_FOLLOWERS followers they switch for good to fan-out
+on read: their posts are merged in from ``posts (user_id, id)`` when a
+timeline is read, as are the reader's own posts.
+"""
+
+import sqlalchemy
+from sqlalchemy.dialects import sqlite
+
+from social_media import sql
+from social_media.config import config
+from social_media.database import (
+    follow_table,
+    post_table,
+    timeline_table,
+    user_table,
+)
+
+# SQLite allows at most 500 SELECTs in one compound statement
+PULLED_AUTHORS_PER_QUERY = 250
+
+
+async def fan_out(author_id: int, post_ids: list[int]) -> bool:
+    """Push new posts to the followers' timelines, False if read on request instead."""
+    query = sqlalchemy.select(
+        user_table.c.follower_count, user_table.c.fan_out_on_read
+    ).where(user_table.c.id == author_id)
+    author = await sql.fetch_one(query)
+    if author.fan_out_on_read:
+        return False
+    if author.follower_count > config.TIMELINE_FANOUT_MAX_FOLLOWERS:
+        query = (
+            user_table.update()
+            .where(user_table.c.id == author_id)
+            .values(fan_out_on_read=True)
+        )
+        await sql.execute(query)
+        return False
+    if author.follower_count:
+        rows = (
+            sqlalchemy.select(follow_table.c.follower_id, post_table.c.id)
+            .select_from(
+                follow_table.join(
+                    post_table, post_table.c.user_id == follow_table.c.followee_id
+                )
+            )
+            .where(
+                follow_table.c.followee_id == author_id, post_table.c.id.in_(post_ids)
+            )
+        )
+        query = timeline_table.insert().from_select(["user_id", "post_id"], rows)
+        await sql.execute(query)
+    return True
+
+
+async def add_to_timeline(follower_id: int, followee_id: int) -> None:
+    """Copy the latest posts of a newly followed user into the follower's timeline."""
+    rows = (
+        sqlalchemy.select(sqlalchemy.literal(follower_id), post_table.c.id)
+        .select_from(
+            post_table.join(user_table, user_table.c.id == post_table.c.user_id)
+        )
+        .where(
+            post_table.c.user_id == followee_id,
+            sqlalchemy.not_(user_table.c.fan_out_on_read),
+        )
+        .order_by(sqlalchemy.desc(post_table.c.id))
+        .limit(config.TIMELINE_BACKFILL_POSTS)
+    )
+    query = (
+        sqlite.insert(timeline_table)
+        .from_select(["user_id", "post_id"], rows)
+        .on_conflict_do_nothing()
+    )
+    await sql.execute(query)
+
+
+async def remove_from_timeline(follower_id: int, followee_id: int) -> None:
+    """Drop the posts of an unfollowed user from the follower's timeline."""
+    by_followee = sqlalchemy.exists().where(
+        post_table.c.id == timeline_table.c.post_id,
+        post_table.c.user_id == followee_id,
+    )
+    query = timeline_table.delete().where(
+        timeline_table.c.user_id == follower_id, by_followee
+    )
+    await sql.execute(query)
+
+
+async def timeline_post_ids(user_id: int, before_id: int | None, count: int) -> list:
+    """Ids of the newest ``count`` posts in a home timeline older than ``before_id``."""
+    pushed = (
+        sqlalchemy.select(timeline_table.c.post_id)
+        .where(timeline_table.c.user_id == user_id)
+        .order_by(sqlalchemy.desc(timeline_table.c.post_id))
+        .limit(count)
+    )
+    if before_id is not None:
+        pushed = pushed.where(timeline_table.c.post_id < before_id)
+    rows = await sql.fetch_all(pushed, read_only=True)
+    post_ids = {row.post_id for row in rows}
+
+    followed_authors = (
+        sqlalchemy.select(follow_table.c.followee_id)
+        .select_from(
+            follow_table.join(user_table, user_table.c.id == follow_table.c.followee_id)
+        )
+        .where(follow_table.c.follower_id == user_id, user_table.c.fan_out_on_read)
+    )
+    rows = await sql.fetch_all(followed_authors, read_only=True)
+    authors = [user_id, *(row.followee_id for row in rows)]
+    # The newest ``count`` posts of each pulled author, each an index range read
+    for i in range(0, len(authors), PULLED_AUTHORS_PER_QUERY):
+        latest = []
+        for author_id in authors[i : i + PULLED_AUTHORS_PER_QUERY]:
+            posts = (
+                sqlalchemy.select(post_table.c.id)
+                .where(post_table.c.user_id == author_id)
+                .order_by(sqlalchemy.desc(post_table.c.id))
+                .limit(count)
+            )
+            if before_id is not None:
+                posts = posts.where(post_table.c.id < before_id)
+            posts = posts.subquery()
+            latest.append(sqlalchemy.select(posts.c.id))
+        rows = await sql.fetch_all(sqlalchemy.union_all(*latest), read_only=True)
+        post_ids.update(row.id for row in rows)
+    return sorted(post_ids, reverse=True)[:count]
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+
+import sqlalchemy
+from sqlalchemy.dialects import sqlite
+
+from social_media import sql
+from social_media.config import config
+from social_media.database import (
+    database,
+    like_table,
+    post_trending_table,
+    trending_state_table,
+)
+
+logger = logging.getLogger(__name__)
+
+# Move scores onto a newer epoch once the current one is this many half-lives
+# old, long before 2 ** age overflows a float (at about 1024 half-lives).
+REBASE_AFTER_HALF_LIVES = 64
+
+
+def unix_seconds(column: sqlalchemy.ColumnElement) -> sqlalchemy.ColumnElement:
+    """A SQLite timestamp column as seconds since 1970."""
+    return (sqlalchemy.func.julianday(column) - 2440587.5) * 86400.0
+
+
+class TrendingRanker:
+    """Keeps post_trending up to date from the likes added since its last refresh.
+
+    A like made at ``t`` is worth ``2 ** ((t - now) / half_life)`` and a post's
+    score is the sum over its likes. Every score decays at the same rate, so
+    rather than decaying each row on every refresh, scores are stored relative
+    to a fixed ``epoch`` (a like is worth ``2 ** ((t - epoch) / half_life)``),
+    which ranks posts the same. A refresh only adds the new likes and drops
+    posts whose score decayed below ``min_score``; the stored scores are
+    rescaled onto a newer epoch every REBASE_AFTER_HALF_LIVES half-lives.
+    """
+
+    def __init__(
+        self,
+        half_life_seconds: float,
+        refresh_interval_seconds: float,
+        min_score: float,
+    ) -> None:
+        self.half_life_seconds = half_life_seconds
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.min_score = min_score
+        # Bumped whenever the ranking may have changed, for caches of its pages
+        self.version = 0
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        self.rebases = 0
+        self.pruned = 0
+        self.last_like_id = 0
+        self._stopped = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._stopped = asyncio.Event()
+        self._task = asyncio.create_task(self._work(), name="trending-ranker")
+
+    async def stop(self) -> None:
+        """Stop the background task, letting a refresh in progress finish."""
+        if not self.running:
+            return
+        self._stopped.set()
+        await self._task
+        self._task = None
+
+    async def refresh(self, now: float | None = None) -> None:
+        """Score the likes added since the last refresh and prune stale posts."""
+        now = time.time() if now is None else now
+        scores = post_trending_table.c.score
+        rebased = False
+        async with database.transaction():
+            # Start with a write, as like_post does: a transaction that reads
+            # first fails with "database is locked" instead of waiting when a
+            # like commits before its first write.
+            await sql.execute(
+                sqlite.insert(trending_state_table)
+                .values(id=1, last_like_id=0, epoch=now)
+                .on_conflict_do_nothing()
+            )
+            state = await sql.fetch_one(sqlalchemy.select(trending_state_table))
+            last_like_id, epoch = state.last_like_id, state.epoch
+
+            if (now - epoch) / self.half_life_seconds > REBASE_AFTER_HALF_LIVES:
+                factor = 2 ** ((epoch - now) / self.half_life_seconds)
+                await sql.execute(
+                    post_trending_table.update().values(score=scores * factor)
+                )
+                epoch, rebased = now, True
+
+            upto = await sql.fetch_val(sqlalchemy.func.max(like_table.c.id).select())
+            upto = upto or last_like_id
+            if upto > last_like_id:
+                weight = sqlalchemy.func.pow(
+                    2.0,
+                    (unix_seconds(like_table.c.created_at) - epoch)
+                    / self.half_life_seconds,
+                )
+                new_scores = (
+                    sqlalchemy.select(like_table.c.post_id, sqlalchemy.func.sum(weight))
+                    .where(like_table.c.id > last_like_id, like_table.c.id <= upto)
+                    .group_by(like_table.c.post_id)
+                )
+                insert_query = sqlite.insert(post_trending_table).from_select(
+                    ["post_id", "score"], new_scores
+                )
+                await sql.execute(
+                    insert_query.on_conflict_do_update(
+                        index_elements=[post_trending_table.c.post_id],
+                        set_={"score": scores + insert_query.excluded.score},
+                    )
+                )
+
+            # In epoch units the cut-off grows as time passes
+            threshold = self.min_score * 2 ** ((now - epoch) / self.half_life_seconds)
+            pruned = await sql.fetch_all(
+                post_trending_table.delete()
+                .where(scores < threshold)
+                .returning(post_trending_table.c.post_id)
+            )
+            await sql.execute(
+                trending_state_table.update().values(last_like_id=upto, epoch=epoch)
+            )
+
+        self.refreshes += 1
+        self.rebases += rebased
+        self.pruned += len(pruned)
+        if upto > last_like_id or pruned or rebased:
+            self.version += 1
+        self.last_like_id = upto
+        logger.debug(
+            "Scored likes %s to %s, pruned %s trending posts",
+            last_like_id,
+            upto,
+            len(pruned),
+        )
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Refreshing trending scores failed")
+                self.failed_refreshes += 1
+            try:
+                await asyncio.wait_for(
+                    self._stopped.wait(), self.refresh_interval_seconds
+                )
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "refreshes": self.refreshes,
+            "failed_refreshes": self.failed_refreshes,
+            "rebases": self.rebases,
+            "pruned": self.pruned,
+            "last_like_id": self.last_like_id,
+        }
+
+
+trending_ranker = TrendingRanker(
+    half_life_seconds=config.TRENDING_HALF_LIFE_HOURS * 3600,
+    refresh_interval_seconds=config.TRENDING_REFRESH_SECONDS,
+    min_score=config.TRENDING_MIN_SCORE,
+)